@@ -0,0 +1,225 @@
+import os
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from embedding_store import EMBEDDINGS_DIR, JobEmbeddingStore, normalize, top_k_indices
+
+# Index selection and recall/latency knobs (see benchmarks/RESULTS.md for the measured trade-off)
+RECOMMENDER_INDEX = os.getenv("RECOMMENDER_INDEX", "exact")
+IVF_NLIST = int(os.getenv("IVF_NLIST", "1024"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "32"))
+# Candidates re-scored in float32 after a float16/int8 first pass (0 keeps the compact scores)
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "100"))
+
+SearchResult = List[Tuple[int, float]]
+
+
+class VectorIndex:
+    """Nearest-neighbour search over the vectors held by a JobEmbeddingStore.
+
+    Vectors live in the store only; an index keeps whatever extra structure it
+    needs to avoid scanning the whole matrix.
+    """
+
+    def __init__(self, store: JobEmbeddingStore, rerank: int = RERANK_CANDIDATES):
+        self.store = store
+        self.rerank = rerank
+
+    def add(self, job_ids: Iterable[int]):
+        """Called after the store gained or overwrote the vectors for job_ids."""
+
+    def remove(self, job_ids: Iterable[int]):
+        """Called after job_ids were dropped from the store."""
+
+    def search(self, queries: np.ndarray, k: int) -> List[SearchResult]:
+        raise NotImplementedError
+
+    def search_subset(self, queries: np.ndarray, candidate_ids: Iterable[int], k: int) -> List[SearchResult]:
+        """Exact search restricted to candidate_ids, e.g. the output of a SQL pre-filter.
+
+        Cost is proportional to the number of candidates, not the catalog.
+        """
+        queries = normalize(np.atleast_2d(queries))
+        return self._rank(queries, candidate_ids, k)
+
+    def _rank(self, queries: np.ndarray, candidate_ids: Optional[Iterable[int]], k: int) -> List[SearchResult]:
+        """Top-k of normalized queries over the candidate jobs (every stored job if None).
+
+        On a quantized store the best `rerank` first-pass candidates are
+        re-scored against the float32 vectors before the final cut. Everything
+        is read from one store snapshot, so a concurrent add can't shift rows
+        under the search.
+        """
+        snapshot = self.store.snapshot
+        row_ids = snapshot.row_ids
+        rows = None if candidate_ids is None else self.store.rows_for(candidate_ids, snapshot)
+        scores = self.store.scores(queries, rows, snapshot)
+        rerank = self.store.quantized and self.rerank > k
+        best = top_k_indices(scores, self.rerank if rerank else k)
+        results = []
+        for u, query in enumerate(queries):
+            # Dead rows score -inf and only come up when fewer live rows are left
+            picked = best[u][np.isfinite(scores[u, best[u]])]
+            candidates = picked if rows is None else rows[picked]
+            candidate_scores = scores[u, picked]
+            if rerank:
+                candidate_scores = self.store.exact_scores(query, candidates, snapshot)
+                order = top_k_indices(candidate_scores, k)[0]
+                candidates, candidate_scores = candidates[order], candidate_scores[order]
+            results.append([(int(row_ids[row]), float(score)) for row, score in zip(candidates, candidate_scores)])
+        return results
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force scan: one matrix product over every stored job."""
+
+    def search(self, queries: np.ndarray, k: int) -> List[SearchResult]:
+        queries = normalize(np.atleast_2d(queries))
+        if len(self.store) == 0:
+            return [[] for _ in range(len(queries))]
+        return self._rank(queries, None, k)
+
+
+class IVFFlatIndex(VectorIndex):
+    """Inverted-file index: jobs are bucketed by their nearest k-means centroid
+    and a query only scans the nprobe closest buckets.
+
+    nlist trades build time for smaller buckets; nprobe trades latency for
+    recall. Below min_train_size vectors the index falls back to an exact scan.
+    """
+
+    def __init__(self, store: JobEmbeddingStore, nlist: int = IVF_NLIST, nprobe: int = IVF_NPROBE,
+                 train_size: int = 50000, train_iters: int = 10, seed: int = 0,
+                 centroids_path: Optional[str] = os.path.join(EMBEDDINGS_DIR, "ivf_centroids.npy")):
+        super().__init__(store)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.train_iters = train_iters
+        self.seed = seed
+        self.centroids_path = centroids_path
+        self.min_train_size = nlist * 4
+        self.centroids = None
+        # Encoder version of the vectors the centroids were trained on
+        self._trained_for = None
+        self.lists: List[np.ndarray] = []
+        self._synced_version = None
+        self._lock = threading.RLock()
+        if centroids_path and os.path.exists(centroids_path):
+            self.centroids = np.load(centroids_path)
+            self._trained_for = store.model_version
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self):
+        """Spherical k-means over a sample of the stored vectors."""
+        with self._lock:
+            rng = np.random.default_rng(self.seed)
+            snapshot = self.store.snapshot
+            live = np.flatnonzero(snapshot.row_ids >= 0)
+            sample = np.asarray(snapshot.vectors[np.sort(rng.choice(live, min(len(live), self.train_size), replace=False))])
+            nlist = min(self.nlist, len(sample))
+            centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+            for _ in range(self.train_iters):
+                assignment = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, sample)
+                empty = np.bincount(assignment, minlength=nlist) == 0
+                if empty.any():
+                    sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+                centroids = normalize(sums)
+            self.centroids = centroids
+            self._trained_for = self.store.model_version
+            if self.centroids_path:
+                np.save(self.centroids_path, centroids)
+            self._synced_version = None
+
+    def _assign(self, vectors: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(np.asarray(vectors[start:start + chunk_size]) @ self.centroids.T, axis=1)
+            for start in range(0, len(vectors), chunk_size)
+        ]) if len(vectors) else np.empty(0, dtype=np.int64)
+
+    def rebuild(self):
+        """Re-bucket every stored vector against the current centroids."""
+        with self._lock:
+            if self.centroids is None or self.centroids.shape[1] != self.store.dim or \
+                    self._trained_for != self.store.model_version:
+                self.train()
+            version, snapshot = self.store.version, self.store.snapshot
+            vectors, row_ids = snapshot.vectors, snapshot.row_ids
+            assignment = self._assign(vectors)
+            # Dead rows go to a bucket past the last list
+            assignment[row_ids[:len(assignment)] < 0] = len(self.centroids)
+            order = np.argsort(assignment, kind="stable")
+            bounds = np.searchsorted(assignment[order], np.arange(len(self.centroids) + 1))
+            ids = row_ids[order]
+            self.lists = [ids[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+            self._synced_version = version
+
+    def _ensure_ready(self) -> bool:
+        if len(self.store) < self.min_train_size:
+            return False
+        if self._synced_version != self.store.version:
+            self.rebuild()
+        return True
+
+    def _follows_store(self) -> bool:
+        """True if the store changed exactly once (the caller's edit) since the last sync.
+
+        Anything else, e.g. a reload of vectors saved by another worker, means
+        the buckets must be rebuilt on the next search.
+        """
+        if self._synced_version != self.store.version - 1:
+            self._synced_version = None
+            return False
+        return True
+
+    def add(self, job_ids: Iterable[int]):
+        with self._lock:
+            if not self._follows_store():
+                return
+            job_ids = np.fromiter(job_ids, dtype=np.int64)
+            self._drop(job_ids)
+            assignment = self._assign(self.store.get(job_ids))
+            for list_no in np.unique(assignment):
+                self.lists[list_no] = np.concatenate([self.lists[list_no], job_ids[assignment == list_no]])
+            self._synced_version = self.store.version
+
+    def remove(self, job_ids: Iterable[int]):
+        with self._lock:
+            if not self._follows_store():
+                return
+            self._drop(np.fromiter(job_ids, dtype=np.int64))
+            self._synced_version = self.store.version
+
+    def _drop(self, job_ids: np.ndarray):
+        for list_no, members in enumerate(self.lists):
+            mask = np.isin(members, job_ids)
+            if mask.any():
+                self.lists[list_no] = members[~mask]
+
+    def search(self, queries: np.ndarray, k: int, nprobe: Optional[int] = None) -> List[SearchResult]:
+        queries = normalize(np.atleast_2d(queries))
+        with self._lock:
+            if not self._ensure_ready():
+                return ExactIndex(self.store, self.rerank).search(queries, k)
+            nprobe = min(nprobe or self.nprobe, len(self.centroids))
+            probes = top_k_indices(queries @ self.centroids.T, nprobe)
+            results = []
+            for query, lists in zip(queries, probes):
+                candidates = np.concatenate([self.lists[list_no] for list_no in lists])
+                results.extend(self._rank(query[None, :], candidates, k))
+            return results
+
+
+def build_index(store: JobEmbeddingStore, kind: str = RECOMMENDER_INDEX) -> VectorIndex:
+    if kind == "exact":
+        return ExactIndex(store)
+    if kind == "ivf":
+        return IVFFlatIndex(store)
+    raise ValueError(f"Unknown recommender index: {kind}")
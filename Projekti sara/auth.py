@@ -10,7 +10,7 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy import func, desc
 
 from database import get_db
-from models import User, Job, Recommendation, CV
+from models import User, Job, Recommendation, CV, CVSkill
 from schemas import UserSchema
 from utils import get_password_hash, verify_password, create_access_token, get_current_user
 
@@ -197,7 +197,7 @@ def get_admin_stats(current_user: User = Depends(get_current_user), db: Session
 
     # Recent activities (last 10 users, CVs, jobs)
     recent_users = db.query(User).order_by(desc(User.created_at)).limit(5).all()
-    recent_cvs = db.query(CV).order_by(desc(CV.created_at)).limit(5).all()
+    recent_cvs = db.query(CV.id, CV.filename, CV.created_at).order_by(desc(CV.created_at)).limit(5).all()
     recent_jobs = db.query(Job).order_by(desc(Job.created_at)).limit(5).all()
     recent = {
         "users": [{"id": u.id, "username": u.username, "created_at": u.created_at} for u in recent_users],
@@ -206,12 +206,9 @@ def get_admin_stats(current_user: User = Depends(get_current_user), db: Session
     }
 
     # Most popular skills (from CVs)
-    skill_counts = {}
-    for cv in db.query(CV).all():
-        skills = (cv.parsed_data or {}).get("skills", [])
-        for skill in skills:
-            skill_counts[skill] = skill_counts.get(skill, 0) + 1
-    top_skills = sorted(skill_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+    skill_count = func.count(CVSkill.cv_id)
+    top_skills = [(skill, count) for skill, count in
+                  db.query(CVSkill.skill, skill_count).group_by(CVSkill.skill).order_by(desc(skill_count)).limit(5)]
 
     # Most popular locations (from jobs)
     location_counts = {}
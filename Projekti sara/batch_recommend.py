@@ -0,0 +1,178 @@
+"""Offline batch recommendations for every user with a CV.
+
+    python batch_recommend.py --workers 4 --chunk-size 1000 --top-k 10
+
+Users are processed in id order, chunk by chunk: profile vectors are taken
+from the profile cache or encoded in one batch, scored against the job
+matrix block by block across a process pool, and the top-k per user is
+upserted into recommendations. A checkpoint is written after every committed
+chunk, so an interrupted run picks up where it stopped (use --restart to
+start over).
+"""
+import argparse
+import datetime
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from database import SessionLocal
+from embedding_store import EMBEDDINGS_DIR, normalize, open_rows, top_k_indices
+from models import CV, CV_DONE, Job, User
+from profile_cache import profile_cache, profile_fingerprint
+from recommendation_engine import recommender, upsert_recommendations
+
+CHECKPOINT_PATH = os.path.join(EMBEDDINGS_DIR, "batch_recommend.checkpoint.json")
+
+# Per-worker view of the job matrix, memory-mapped so all workers share the page cache
+_job_vectors = None
+_job_ids = None
+_excluded = None
+
+
+def _init_worker(vectors_path: str, rows: int, dim: int, row_ids: np.ndarray, excluded: np.ndarray):
+    global _job_vectors, _job_ids, _excluded
+    _job_vectors = open_rows(vectors_path, np.float32, rows, dim)
+    _job_ids = row_ids
+    _excluded = excluded
+
+
+def _score_block(queries: np.ndarray, start: int, stop: int, top_k: int):
+    scores = queries @ np.asarray(_job_vectors[start:stop]).T
+    scores[:, _excluded[start:stop]] = -np.inf
+    best = top_k_indices(scores, top_k)
+    return _job_ids[start + best], np.take_along_axis(scores, best, axis=1)
+
+
+def load_checkpoint() -> Optional[dict]:
+    if not os.path.exists(CHECKPOINT_PATH):
+        return None
+    with open(CHECKPOINT_PATH) as f:
+        return json.load(f)
+
+
+def save_checkpoint(state: dict):
+    tmp_path = CHECKPOINT_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, CHECKPOINT_PATH)
+
+
+def latest_cvs(db, user_ids: List[int]) -> Dict[int, CV]:
+    latest = {}
+    for cv in db.query(CV).filter(CV.user_id.in_(user_ids), CV.status == CV_DONE).order_by(CV.user_id, CV.created_at.desc()):
+        latest.setdefault(cv.user_id, cv)
+    return latest
+
+
+def profile_vectors(cvs: Dict[int, CV]) -> Dict[int, np.ndarray]:
+    """Profile embeddings for a chunk of users; cache misses are encoded in a single batch."""
+    vectors, missing = {}, []
+    for user_id, cv in cvs.items():
+        if not cv.parsed_data:
+            continue
+        fingerprint = profile_fingerprint(cv.parsed_data)
+        cached = profile_cache.get(cv.id, fingerprint, recommender.model_version)
+        if cached is not None:
+            vectors[user_id] = cached
+            continue
+        text = recommender.build_profile_text(cv.parsed_data)
+        if text:
+            missing.append((user_id, cv.id, fingerprint, text))
+    if missing:
+        encoded = recommender.model.encode([text for _, _, _, text in missing])
+        for (user_id, cv_id, fingerprint, _), vector in zip(missing, encoded):
+            profile_cache.put(user_id, cv_id, fingerprint, recommender.model.model_version, vector)
+            vectors[user_id] = vector
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute recommendations for all users.")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="users per chunk / transaction")
+    parser.add_argument("--block-size", type=int, default=50000, help="jobs per matrix block")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of a previous run")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        # Make sure the persisted matrix covers the current catalog before workers map it
+        recommender.sync_store(db, force=True)
+        store = recommender.store
+        if len(store) == 0:
+            print("No job embeddings to score against.")
+            return
+        expired_ids = [job_id for (job_id,) in db.query(Job.id).filter(Job.expiration_date <= datetime.datetime.utcnow())]
+        # Removed and overwritten rows are still in the matrix, with id -1
+        row_ids = store.row_ids
+        excluded = np.isin(row_ids, expired_ids) | (row_ids < 0)
+
+        checkpoint = None if args.restart else load_checkpoint()
+        last_user_id = checkpoint["last_user_id"] if checkpoint else 0
+        users_done = checkpoint["users_done"] if checkpoint else 0
+        rows_written = checkpoint["rows_written"] if checkpoint else 0
+        if checkpoint:
+            print(f"Resuming after user {last_user_id} ({users_done} users, {rows_written} rows already written)")
+
+        blocks = [(start, min(start + args.block_size, len(row_ids))) for start in range(0, len(row_ids), args.block_size)]
+        started = time.perf_counter()
+        session_rows = 0
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(store.vectors_path, len(row_ids), store.dim, row_ids, excluded)) as pool:
+            while True:
+                user_ids = [user_id for (user_id,) in db.query(User.id)
+                            .filter(User.id > last_user_id)
+                            .order_by(User.id)
+                            .limit(args.chunk_size)]
+                if not user_ids:
+                    break
+
+                vectors = profile_vectors(latest_cvs(db, user_ids))
+                chunk_users = [user_id for user_id in user_ids if user_id in vectors]
+                rows = []
+                if chunk_users:
+                    queries = normalize(np.stack([vectors[user_id] for user_id in chunk_users]))
+                    futures = [pool.submit(_score_block, queries, start, stop, args.top_k) for start, stop in blocks]
+                    parts = [future.result() for future in futures]
+                    candidate_ids = np.concatenate([ids for ids, _ in parts], axis=1)
+                    candidate_scores = np.concatenate([scores for _, scores in parts], axis=1)
+                    best = top_k_indices(candidate_scores, args.top_k)
+                    now = datetime.datetime.utcnow()
+                    for u, user_id in enumerate(chunk_users):
+                        for j in best[u]:
+                            if np.isfinite(candidate_scores[u, j]):
+                                rows.append({
+                                    "user_id": user_id,
+                                    "job_id": int(candidate_ids[u, j]),
+                                    "score": float(candidate_scores[u, j]),
+                                    "created_at": now,
+                                })
+                upsert_recommendations(db, rows)
+                db.commit()
+
+                last_user_id = user_ids[-1]
+                users_done += len(chunk_users)
+                rows_written += len(rows)
+                session_rows += len(rows)
+                save_checkpoint({"last_user_id": last_user_id, "users_done": users_done, "rows_written": rows_written})
+                elapsed = time.perf_counter() - started
+                print(f"users {users_done}  rows {rows_written}  last user {last_user_id}  "
+                      f"{session_rows / elapsed:.0f} rows/s  {elapsed:.1f}s")
+
+        # Finished: the next run starts from the first user again
+        if os.path.exists(CHECKPOINT_PATH):
+            os.remove(CHECKPOINT_PATH)
+        elapsed = time.perf_counter() - started
+        print(f"Done: {users_done} users, {rows_written} rows in {elapsed:.1f}s "
+              f"({session_rows / max(elapsed, 1e-9):.0f} rows/s)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
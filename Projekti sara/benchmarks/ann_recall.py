@@ -0,0 +1,79 @@
+"""Recall-vs-exact benchmark for the recommendation ANN index.
+
+Run from the backend directory:
+
+    python -m benchmarks.ann_recall --jobs 200000 --nlist 256 1024 --nprobe 4 8 16 32
+
+Uses synthetic clustered vectors by default, or the live job embedding store
+with --from-store. Pick IVF_NLIST / IVF_NPROBE from the printed table.
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from ann_index import ExactIndex, IVFFlatIndex
+from embedding_store import JobEmbeddingStore, normalize
+
+
+def synthetic_store(n_jobs: int, dim: int, n_clusters: int, noise: float, seed: int) -> JobEmbeddingStore:
+    rng = np.random.default_rng(seed)
+    centers = normalize(rng.standard_normal((n_clusters, dim)))
+    vectors = centers[rng.integers(0, n_clusters, n_jobs)] + noise * rng.standard_normal((n_jobs, dim)) / np.sqrt(dim)
+    store = JobEmbeddingStore(directory=tempfile.mkdtemp())
+    store.add(np.arange(1, n_jobs + 1), vectors.astype(np.float32))
+    return store
+
+
+def recall(approx, exact) -> float:
+    hits = sum(len({job_id for job_id, _ in a} & {job_id for job_id, _ in e}) for a, e in zip(approx, exact))
+    return hits / max(1, sum(len(e) for e in exact))
+
+
+def timed_search(index, queries, k, **kwargs):
+    start = time.perf_counter()
+    results = [index.search(query, k, **kwargs)[0] for query in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=1.0, help="spread of synthetic vectors around their cluster")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nlist", type=int, nargs="+", default=[256, 1024])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    parser.add_argument("--from-store", action="store_true", help="benchmark the persisted job embeddings")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    store = JobEmbeddingStore() if args.from_store else synthetic_store(args.jobs, args.dim, args.clusters, args.noise, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    # Queries are perturbed job vectors, roughly what a CV profile looks like
+    picks = store.get(store.ids[rng.integers(0, len(store), args.queries)])
+    queries = normalize(picks + args.noise * rng.standard_normal(picks.shape).astype(np.float32) / np.sqrt(store.dim))
+
+    exact, exact_ms = timed_search(ExactIndex(store), queries, args.k)
+    print(f"jobs={len(store)} dim={store.dim} k={args.k} queries={len(queries)}")
+    print(f"{'index':<8}{'nlist':>7}{'nprobe':>8}{'build s':>9}{'ms/query':>10}{'recall':>8}")
+    print(f"{'exact':<8}{'-':>7}{'-':>8}{'-':>9}{exact_ms:>10.2f}{1.0:>8.3f}")
+
+    for nlist in args.nlist:
+        index = IVFFlatIndex(store, nlist=nlist, centroids_path=None)
+        index.min_train_size = 0
+        start = time.perf_counter()
+        index.rebuild()
+        build_s = time.perf_counter() - start
+        for nprobe in args.nprobe:
+            if nprobe > nlist:
+                continue
+            approx, ms = timed_search(index, queries, args.k, nprobe=nprobe)
+            print(f"{'ivf':<8}{nlist:>7}{nprobe:>8}{build_s:>9.2f}{ms:>10.2f}{recall(approx, exact):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Scoring throughput of batch_recommend: per-user job loop against blocked matrix products.
+
+Run from the backend directory:
+
+    python -m benchmarks.batch_scoring --jobs 100000 --users 2000 --workers 1 4
+
+Only the scoring step is timed (no database reads or writes). "loop" scores
+one user at a time against every job with JobRecommender.calculate_similarity,
+as get_recommendations does, over --loop-users users; the other rows run
+batch_recommend's _score_block over the same store in chunks of --chunk-size
+users and blocks of --block-size jobs across a process pool. Job vectors are
+synthetic clustered vectors, as in ann_recall.
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch_recommend import _init_worker, _score_block
+from benchmarks.ann_recall import synthetic_store
+from benchmarks.quantization import reference_rankings
+from embedding_store import normalize, top_k_indices
+
+
+def blocked(store, queries: np.ndarray, workers: int, chunk_size: int, block_size: int, top_k: int) -> np.ndarray:
+    row_ids = store.row_ids
+    blocks = [(start, min(start + block_size, len(row_ids))) for start in range(0, len(row_ids), block_size)]
+    best_ids = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(store.vectors_path, len(row_ids), store.dim, row_ids, row_ids < 0)) as pool:
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            parts = [future.result() for future in
+                     [pool.submit(_score_block, chunk, block_start, block_stop, top_k) for block_start, block_stop in blocks]]
+            candidate_ids = np.concatenate([ids for ids, _ in parts], axis=1)
+            candidate_scores = np.concatenate([scores for _, scores in parts], axis=1)
+            best_ids.append(np.take_along_axis(candidate_ids, top_k_indices(candidate_scores, top_k), axis=1))
+    return np.concatenate(best_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--loop-users", type=int, default=3, help="users timed for the (slow) per-user loop")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--block-size", type=int, default=50000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    store = synthetic_store(args.jobs, args.dim, args.clusters, 1.0, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = normalize(rng.standard_normal((args.users, args.dim)))
+    print(f"jobs={len(store)} dim={store.dim} users={args.users} top_k={args.top_k}")
+    print(f"{'path':<16}{'users/s':>10}{'rows/s':>10}{'agree':>7}")
+
+    start = time.perf_counter()
+    reference = reference_rankings(store, queries[:args.loop_users], args.top_k)
+    users_per_s = args.loop_users / (time.perf_counter() - start)
+    print(f"{'loop':<16}{users_per_s:>10.1f}{users_per_s * args.top_k:>10.0f}{1.0:>7.2f}")
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        best_ids = blocked(store, queries, workers, args.chunk_size, args.block_size, args.top_k)
+        users_per_s = args.users / (time.perf_counter() - start)
+        agree = np.mean([set(best_ids[u]) == {job_id for job_id, _ in ranking} for u, ranking in enumerate(reference)])
+        print(f"{f'blocked w={workers}':<16}{users_per_s:>10.1f}{users_per_s * args.top_k:>10.0f}{agree:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
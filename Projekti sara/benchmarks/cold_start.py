@@ -0,0 +1,70 @@
+"""Cold-start benchmark: import time, first request and first model-backed call, with and without warm-up.
+
+Run from the backend directory (needs the database driver importable, but no
+running database):
+
+    python -m benchmarks.cold_start
+
+Each scenario runs in a fresh interpreter so nothing is cached between them.
+"first request" is GET /health/ready through the ASGI app right after the
+import, i.e. how long a freshly started worker makes its first client wait
+when that request needs no model. "first call" runs the spaCy pipeline and
+the encoder once; it is reported as "-" when a model can't be loaded.
+"""
+import json
+import os
+import subprocess
+import sys
+
+SCENARIO = r"""
+import json, time
+start = time.perf_counter()
+import main
+import_s = time.perf_counter() - start
+
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+start = time.perf_counter()
+client.get("/health/ready")
+first_request_s = time.perf_counter() - start
+
+warmup_s = None
+if WARMUP:
+    from model_loader import warm_up
+    start = time.perf_counter()
+    warm_up()
+    warmup_s = time.perf_counter() - start
+
+from cv_nlp import nlp
+from recommendation_engine import recommender
+start = time.perf_counter()
+try:
+    nlp.get()("Senior Python developer with SQL, Docker and AWS experience in London.")
+    recommender.get_embeddings("Skills: python, sql, docker, aws")
+    first_call_s = time.perf_counter() - start
+except Exception:
+    first_call_s = None
+print(json.dumps({"import_s": import_s, "first_request_s": first_request_s, "warmup_s": warmup_s,
+                  "first_call_s": first_call_s}))
+"""
+
+
+def run(warmup: bool) -> dict:
+    env = dict(os.environ, CREATE_TABLES_ON_STARTUP="0", WARMUP_MODELS="0")
+    code = f"WARMUP = {warmup}\n" + SCENARIO
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'scenario':<12}{'import s':>10}{'first request s':>17}{'warm-up s':>11}{'first call s':>14}")
+    for warmup in (False, True):
+        result = run(warmup)
+        warmup_s = f"{result['warmup_s']:.2f}" if result["warmup_s"] is not None else "-"
+        first_call_s = f"{result['first_call_s']:.2f}" if result["first_call_s"] is not None else "-"
+        name = "warm-up" if warmup else "lazy"
+        print(f"{name:<12}{result['import_s']:>10.2f}{result['first_request_s']:>17.3f}{warmup_s:>11}{first_call_s:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Documents/second of the CV spaCy layer against the original one-at-a-time full pipeline.
+
+Run from the backend directory (needs en_core_web_sm installed):
+
+    python -m benchmarks.cv_nlp --docs 200 --batch-sizes 8 32 --processes 1 4
+
+"full, nlp(doc)" is the path parse_cv used before: the whole en_core_web_sm
+pipeline called once per CV. The other rows run the trimmed pipeline
+(tok2vec + ner + sentencizer) through nlp.pipe. Entity and skill agreement
+with the full pipeline is reported next to the speed.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from cv_nlp import doc_to_parse, load_cv_pipeline
+
+FIRST_NAMES = ["Alice", "Mohammed", "Olivia", "James", "Priya", "Tomasz", "Grace", "Daniel"]
+LAST_NAMES = ["Smith", "Khan", "Jones", "Nowak", "Patel", "Brown", "Williams", "Taylor"]
+COMPANIES = ["Barclays", "Tesco", "the NHS", "Deloitte", "Ocado", "BT Group", "Rolls-Royce", "Sky"]
+CITIES = ["London", "Manchester", "Leeds", "Bristol", "Glasgow", "Cardiff", "Birmingham"]
+SKILLS = ["Python", "SQL", "Docker", "AWS", "React", "Java", "JavaScript", "node", "Excel", "Kubernetes"]
+DUTIES = [
+    "Led a team of {n} engineers delivering {skill} services for {company}.",
+    "Built reporting pipelines in {skill} and {skill2}, cutting run time by {n}0%.",
+    "Worked with stakeholders in {city} to migrate legacy systems to {skill}.",
+    "Mentored junior developers and ran weekly {skill} workshops.",
+    "Maintained {skill2} infrastructure serving {n} million requests a day.",
+]
+
+
+def synthetic_cv(rng: np.random.Generator) -> str:
+    def pick(options):
+        return options[int(rng.integers(len(options)))]
+
+    lines = [f"{pick(FIRST_NAMES)} {pick(LAST_NAMES)}", f"{pick(CITIES)}, United Kingdom", "", "Experience"]
+    for _ in range(int(rng.integers(2, 6))):
+        lines.append(f"Software Engineer at {pick(COMPANIES)}, {pick(CITIES)} ({int(rng.integers(2010, 2024))})")
+        for _ in range(int(rng.integers(3, 8))):
+            lines.append(pick(DUTIES).format(n=int(rng.integers(2, 9)), skill=pick(SKILLS), skill2=pick(SKILLS),
+                                             company=pick(COMPANIES), city=pick(CITIES)))
+    lines += ["", "Education", f"BSc Computer Science, University of {pick(CITIES)}",
+              "", "Skills: " + ", ".join(rng.choice(SKILLS, 5, replace=False))]
+    return "\n".join(lines)
+
+
+def agreement(results, reference) -> str:
+    entities = np.mean([r["entities"] == e["entities"] for r, e in zip(results, reference)])
+    skills = np.mean([sorted(r["skills"]) == sorted(e["skills"]) for r, e in zip(results, reference)])
+    return f"{entities:>10.2f}{skills:>8.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    texts = [synthetic_cv(rng) for _ in range(args.docs)]
+    print(f"docs={len(texts)} avg chars={np.mean([len(t) for t in texts]):.0f}")
+    print(f"{'path':<34}{'docs/s':>9}{'entities=':>10}{'skills=':>8}")
+
+    full = load_cv_pipeline(full=True)
+    full(texts[0])
+    start = time.perf_counter()
+    reference = [doc_to_parse(full(text)) for text in texts]
+    rate = len(texts) / (time.perf_counter() - start)
+    print(f"{'full, nlp(doc)':<34}{rate:>9.1f}{agreement(reference, reference)}")
+
+    trimmed = load_cv_pipeline(full=False)
+    trimmed(texts[0])
+    start = time.perf_counter()
+    results = [doc_to_parse(trimmed(text)) for text in texts]
+    rate = len(texts) / (time.perf_counter() - start)
+    print(f"{'trimmed, nlp(doc)':<34}{rate:>9.1f}{agreement(results, reference)}")
+
+    for n_process in args.processes:
+        for batch_size in args.batch_sizes:
+            start = time.perf_counter()
+            results = [doc_to_parse(doc) for doc in trimmed.pipe(texts, batch_size=batch_size, n_process=n_process)]
+            rate = len(texts) / (time.perf_counter() - start)
+            label = f"trimmed, pipe b={batch_size} p={n_process}"
+            print(f"{label:<34}{rate:>9.1f}{agreement(results, reference)}")
+
+
+if __name__ == "__main__":
+    main()
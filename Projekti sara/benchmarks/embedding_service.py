@@ -0,0 +1,92 @@
+"""Encode throughput under concurrent single-text requests: per-worker encoder against the shared service.
+
+Run from the backend directory (needs the ENCODER_BACKEND packages, e.g.
+sentence-transformers for the default torch backend):
+
+    python -m benchmarks.embedding_service --concurrency 1 8 32 --requests 200
+
+"in-process" is what every API worker did before: its own encoder, called
+with one text per request from concurrent threads. "service" starts
+embedding_service.py in a subprocess and sends the same requests through
+EmbeddingServiceClient, so concurrent texts are merged into micro-batches
+(EMBEDDING_MAX_BATCH / EMBEDDING_MAX_WAIT_MS). The resident memory of the
+encoder is printed once, since the service holds one copy per host instead
+of one per worker.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.encoders import synthetic_texts
+from embedding_service import EmbeddingServiceClient
+from encoders import load_encoder
+
+
+def run(encode, texts, concurrency: int) -> tuple:
+    latencies = []
+
+    def one(text):
+        start = time.perf_counter()
+        encode(text)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, texts))
+    elapsed = time.perf_counter() - start
+    return len(texts) / elapsed, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 95) * 1000
+
+
+def start_service(socket_path: str) -> subprocess.Popen:
+    env = dict(os.environ, EMBEDDING_SERVICE_SOCKET=socket_path)
+    service = subprocess.Popen([sys.executable, "embedding_service.py"], env=env)
+    client = EmbeddingServiceClient(socket_path)
+    deadline = time.perf_counter() + 300
+    while True:
+        try:
+            client.info()
+            return service
+        except OSError:
+            if service.poll() is not None or time.perf_counter() > deadline:
+                service.kill()
+                raise RuntimeError("Embedding service did not start")
+            time.sleep(0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.requests, args.seed)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    encoder = load_encoder()
+    encoder.encode(texts[:8])
+    print(f"backend={encoder.model_version} encoder RSS ~{(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) // 1024} MB")
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "embeddings.sock")
+    service = start_service(socket_path)
+    try:
+        client = EmbeddingServiceClient(socket_path)
+        client.encode(texts[:8])
+        print(f"{'path':<12}{'threads':>8}{'texts/s':>10}{'p50 ms':>9}{'p95 ms':>9}")
+        for concurrency in args.concurrency:
+            for name, encode in (("in-process", encoder.encode), ("service", client.encode)):
+                texts_per_s, p50, p95 = run(encode, texts, concurrency)
+                print(f"{name:<12}{concurrency:>8}{texts_per_s:>10.1f}{p50:>9.1f}{p95:>9.1f}")
+    finally:
+        service.terminate()
+        service.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Parity and CPU throughput of the encoder backends.
+
+Run from the backend directory:
+
+    python -m benchmarks.encoders --backends torch torch-qint8 onnx --batch-sizes 1 16 64
+
+Every backend is compared with the eager torch reference (cosine agreement
+on the same texts) and timed for single-text latency and batched
+throughput. Texts are synthetic job postings by default, or the stored job
+titles/descriptions with --from-db.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from encoders import ENCODER_BACKENDS, load_encoder, parity
+
+WORDS = ("senior junior software engineer developer python java data analyst manager sales "
+         "marketing nurse teacher accountant remote london manchester contract permanent "
+         "team experience skills customer support design cloud sql warehouse driver finance").split()
+
+
+def synthetic_texts(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(WORDS, int(rng.integers(20, 200)))) for _ in range(n)]
+
+
+def db_texts(n: int):
+    from database import SessionLocal
+    from models import Job
+    from recommendation_engine import recommender
+
+    db = SessionLocal()
+    try:
+        return [recommender.get_job_text(job) for job in db.query(Job).limit(n)]
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=list(ENCODER_BACKENDS))
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--single", type=int, default=100, help="single-text calls timed per backend")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--from-db", action="store_true", help="encode stored job texts")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = db_texts(args.texts) if args.from_db else synthetic_texts(args.texts, args.seed)
+    start = time.perf_counter()
+    reference = load_encoder("torch")
+    reference_load_s = time.perf_counter() - start
+    print(f"texts={len(texts)} single={args.single}")
+    print(f"{'backend':<13}{'load s':>8}{'min cos':>9}{'p01 cos':>9}{'mean cos':>10}{'p50 ms':>8}"
+          + "".join(f"{f'b{b} txt/s':>11}" for b in args.batch_sizes))
+
+    for backend in args.backends:
+        if backend == "torch":
+            encoder, load_s = reference, reference_load_s
+        else:
+            start = time.perf_counter()
+            encoder = load_encoder(backend)
+            load_s = time.perf_counter() - start
+        agreement = parity(encoder, reference, texts)
+        encoder.encode("warm up")
+
+        latencies = []
+        for text in texts[:args.single]:
+            start = time.perf_counter()
+            encoder.encode(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        throughput = []
+        for batch_size in args.batch_sizes:
+            start = time.perf_counter()
+            encoder.encode(texts, batch_size=batch_size)
+            throughput.append(len(texts) / (time.perf_counter() - start))
+
+        print(f"{backend:<13}{load_s:>8.1f}{agreement['min_cosine']:>9.4f}{agreement['p01_cosine']:>9.4f}"
+              f"{agreement['mean_cosine']:>10.4f}{np.median(latencies):>8.2f}"
+              + "".join(f"{rate:>11.0f}" for rate in throughput))
+
+
+if __name__ == "__main__":
+    main()
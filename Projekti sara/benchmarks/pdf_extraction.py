@@ -0,0 +1,92 @@
+"""PDF text extraction: the original page loop against document_extraction.
+
+Run from the backend directory:
+
+    python -m benchmarks.pdf_extraction --pages 2 10 50 200
+
+Fixtures are generated text PDFs (one Helvetica text block per page) written
+to a temporary directory. "loop" is the code parse_cv used before
+(content += page.extract_text() over every page); the other rows call
+extract_pdf with the page/character budget lifted, so all rows extract the
+same pages, and with the default budget.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import PyPDF2
+
+from benchmarks.cv_nlp import synthetic_cv
+from document_extraction import CV_MAX_CHARS, CV_MAX_PAGES, extract_pdf
+
+
+def write_pdf(path: str, pages):
+    """Minimal PDF with one page per list of text lines."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        escaped = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in lines]
+        stream = "BT /F1 9 Tf 12 TL 40 800 Td " + " ".join(f"({line}) '" for line in escaped) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def old_loop(file_path: str) -> str:
+    with open(file_path, "rb") as f:
+        pdf_reader = PyPDF2.PdfReader(f)
+        content = ""
+        for page in pdf_reader.pages:
+            content += page.extract_text()
+    return content
+
+
+def timed(function, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[2, 10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'pages':>6}{'path':>22}{'ms':>10}{'chars':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n_pages in args.pages:
+            path = os.path.join(directory, f"cv_{n_pages}.pdf")
+            write_pdf(path, [synthetic_cv(rng).splitlines()[:60] for _ in range(n_pages)])
+
+            ms, text = timed(lambda: old_loop(path), args.repeat)
+            print(f"{n_pages:>6}{'loop':>22}{ms:>10.1f}{len(text):>10}")
+            ms, text = timed(lambda: extract_pdf(path, max_pages=n_pages, max_chars=10 ** 9), args.repeat)
+            print(f"{n_pages:>6}{'extract_pdf':>22}{ms:>10.1f}{len(text):>10}")
+            ms, text = timed(lambda: extract_pdf(path), args.repeat)
+            label = f"budget {CV_MAX_PAGES}p/{CV_MAX_CHARS // 1000}k"
+            print(f"{n_pages:>6}{label:>22}{ms:>10.1f}{len(text):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Memory and recall of the float16/int8 embedding store formats.
+
+Run from the backend directory:
+
+    python -m benchmarks.quantization --jobs 100000 --rerank 0 50 100
+
+The reference ranking is the one JobRecommender.calculate_similarity gives
+(cosine over the raw float32 vectors, one job at a time), so the recall
+column is agreement with the recommendations served before quantization.
+Uses synthetic clustered vectors by default, or the live job embedding store
+with --from-store.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ann_index import ExactIndex
+from benchmarks.ann_recall import recall, synthetic_store
+from embedding_store import STORE_DTYPES, JobEmbeddingStore, normalize
+from recommendation_engine import JobRecommender
+
+
+def reference_rankings(store: JobEmbeddingStore, queries: np.ndarray, k: int):
+    similarity = JobRecommender.calculate_similarity
+    live = np.flatnonzero(store.row_ids >= 0)
+    vectors = np.asarray(store.vectors[live])
+    results = []
+    for query in queries:
+        scores = [similarity(None, query, vector) for vector in vectors]
+        best = np.argsort(scores)[::-1][:k]
+        results.append([(int(store.row_ids[live[j]]), scores[j]) for j in best])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=1.0, help="spread of synthetic vectors around their cluster")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rerank", type=int, nargs="+", default=[0, 50, 100])
+    parser.add_argument("--from-store", action="store_true", help="benchmark the persisted job embeddings")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    base = JobEmbeddingStore(dtype="float32") if args.from_store else \
+        synthetic_store(args.jobs, args.dim, args.clusters, args.noise, args.seed)
+    directory = base.directory
+    rng = np.random.default_rng(args.seed + 1)
+    picks = base.get(base.ids[rng.integers(0, len(base), args.queries)])
+    queries = normalize(picks + args.noise * rng.standard_normal(picks.shape).astype(np.float32) / np.sqrt(base.dim))
+
+    start = time.perf_counter()
+    reference = reference_rankings(base, queries, args.k)
+    reference_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    print(f"jobs={len(base)} dim={base.dim} k={args.k} queries={len(queries)}")
+    print(f"{'dtype':<9}{'rerank':>7}{'MB':>9}{'B/job':>7}{'ms/query':>10}{'recall':>8}{'top1':>7}{'max |dscore|':>14}")
+    print(f"{'loop':<9}{'-':>7}{base.vectors.nbytes / 2**20:>9.1f}{base.vectors.nbytes // len(base):>7}"
+          f"{reference_ms:>10.2f}{1.0:>8.3f}{1.0:>7.2f}{0.0:>14.5f}")
+
+    for dtype in STORE_DTYPES:
+        # Opening the committed float32 rows with another dtype quantizes them on load
+        store = JobEmbeddingStore(directory=directory, dtype=dtype)
+        for rerank in (args.rerank if store.quantized else [0]):
+            index = ExactIndex(store, rerank=rerank)
+            start = time.perf_counter()
+            results = [index.search(query, args.k)[0] for query in queries]
+            ms = (time.perf_counter() - start) / len(queries) * 1000
+            top1 = np.mean([r[0][0] == e[0][0] for r, e in zip(results, reference)])
+            reference_scores = [dict(e) for e in reference]
+            drift = max((abs(score - scores[job_id]) for r, scores in zip(results, reference_scores)
+                         for job_id, score in r if job_id in scores), default=0.0)
+            memory = store.memory_bytes()
+            print(f"{dtype:<9}{rerank:>7}{memory / 2**20:>9.1f}{memory // len(store):>7}"
+                  f"{ms:>10.2f}{recall(results, reference):>8.3f}{top1:>7.2f}{drift:>14.5f}")
+
+
+if __name__ == "__main__":
+    main()
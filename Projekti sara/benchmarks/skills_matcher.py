@@ -0,0 +1,80 @@
+"""Skill extraction throughput: per-token keyword loop against the compiled taxonomy matcher.
+
+Run from the backend directory (only needs spaCy, not a trained model):
+
+    python -m benchmarks.skills_matcher --terms 0 10000 50000 --docs 200
+
+The taxonomy is the shipped one (about 6k names) padded with generated one-
+to three-word skill names up to --terms names; 0 runs it unpadded. "token
+loop" is the old extract_skills check (token.text.lower() in a list) run
+against the single-word names only, since it cannot match the others;
+SkillMatcher matches all of them.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.cv_nlp import synthetic_cv
+from skills_taxonomy import SkillMatcher, load_taxonomy
+
+SYLLABLES = ["ka", "lo", "mi", "ra", "tek", "on", "vu", "zen", "dor", "ix", "pa", "sul", "qu", "ber", "no"]
+
+
+def padded_taxonomy(n_terms: int, rng: np.random.Generator) -> dict:
+    taxonomy = load_taxonomy()
+    names = len(taxonomy) + sum(len(aliases) for aliases in taxonomy.values())
+    while names < n_terms:
+        words = ["".join(rng.choice(SYLLABLES, int(rng.integers(2, 4)))) for _ in range(int(rng.integers(1, 4)))]
+        skill = " ".join(words)
+        if skill not in taxonomy:
+            taxonomy[skill] = []
+            names += 1
+    return taxonomy
+
+
+def token_loop(doc, skill_keywords) -> list:
+    skills = []
+    for token in doc:
+        if token.text.lower() in skill_keywords:
+            skills.append(token.text.lower())
+    return list(set(skills))
+
+
+def rate(function, docs) -> tuple:
+    start = time.perf_counter()
+    found = sum(len(function(doc)) for doc in docs)
+    return len(docs) / (time.perf_counter() - start), found / len(docs)
+
+
+def main():
+    import spacy
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--terms", type=int, nargs="+", default=[0, 10000, 50000])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--loop-docs", type=int, default=20, help="docs timed for the (slow) token loop")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    nlp = spacy.blank("en")
+    docs = list(nlp.pipe(synthetic_cv(rng) for _ in range(args.docs)))
+    print(f"docs={len(docs)} avg tokens={np.mean([len(doc) for doc in docs]):.0f}")
+    print(f"{'terms':>7}{'path':>14}{'build s':>9}{'docs/s':>10}{'skills/doc':>11}")
+    for n_terms in args.terms:
+        taxonomy = padded_taxonomy(n_terms, rng)
+        n_terms = len(taxonomy) + sum(len(aliases) for aliases in taxonomy.values())
+        keywords = [name for skill, aliases in taxonomy.items() for name in [skill, *aliases] if " " not in name]
+        docs_per_s, per_doc = rate(lambda doc: token_loop(doc, keywords), docs[:args.loop_docs])
+        print(f"{n_terms:>7}{'token loop':>14}{'-':>9}{docs_per_s:>10.1f}{per_doc:>11.1f}")
+
+        start = time.perf_counter()
+        matcher = SkillMatcher(nlp, taxonomy)
+        build = time.perf_counter() - start
+        docs_per_s, per_doc = rate(matcher, docs)
+        print(f"{n_terms:>7}{'SkillMatcher':>14}{build:>9.2f}{docs_per_s:>10.1f}{per_doc:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""spaCy layer for CV parsing.
+
+parse_cv only needs token text, entities and sentences, so by default the
+pipeline keeps tok2vec + ner and replaces the dependency parser with the
+rule-based sentencizer; the tagger, lemmatizer and attribute ruler are
+excluded. CV_NLP_FULL_PIPELINE=1 restores the full en_core_web_sm pipeline
+(parser-based sentences) if the sentencizer's splits are not good enough.
+
+Several documents are best handed over together to parse_texts, which runs
+nlp.pipe with batching and optionally several processes.
+"""
+import os
+from importlib import metadata
+from typing import Any, Dict, Iterable, List
+
+from model_loader import LazyModel
+from skills_taxonomy import SkillMatcher, load_taxonomy, taxonomy_version
+
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+CV_NLP_FULL_PIPELINE = os.getenv("CV_NLP_FULL_PIPELINE", "0") == "1"
+CV_NLP_BATCH_SIZE = int(os.getenv("CV_NLP_BATCH_SIZE", "16"))
+# Processes used by parse_texts for large batches (1 = in-process)
+CV_NLP_PROCESSES = int(os.getenv("CV_NLP_PROCESSES", "1"))
+
+UNUSED_PIPES = ["parser", "tagger", "attribute_ruler", "lemmatizer"]
+
+
+def pipeline_version() -> str:
+    """Model package version, pipeline shape and skills taxonomy, without loading the model."""
+    try:
+        model_version = metadata.version(SPACY_MODEL)
+    except metadata.PackageNotFoundError:
+        model_version = "unknown"
+    shape = "" if CV_NLP_FULL_PIPELINE else "-trimmed"
+    return f"{SPACY_MODEL}-{model_version}{shape}/skills-{taxonomy_version()}"
+
+
+def load_cv_pipeline(full: bool = CV_NLP_FULL_PIPELINE):
+    import spacy
+
+    if full:
+        return spacy.load(SPACY_MODEL)
+    nlp = spacy.load(SPACY_MODEL, exclude=UNUSED_PIPES)
+    nlp.add_pipe("sentencizer", first=True)
+    return nlp
+
+
+# spaCy model, loaded on first use or by the startup warm-up
+nlp = LazyModel("spacy_en_core_web_sm", load_cv_pipeline)
+# Compiled skills taxonomy, built once on the loaded pipeline's vocab
+skill_matcher = LazyModel("skills_matcher", lambda: SkillMatcher(nlp.get(), load_taxonomy()))
+
+
+def extract_skills(doc) -> list:
+    return skill_matcher.get()(doc)
+
+
+def doc_to_parse(doc) -> Dict[str, Any]:
+    return {
+        # Extract entities (e.g., names, organizations, skills)
+        "entities": {ent.label_: ent.text for ent in doc.ents},
+        # Extract sentences for further processing
+        "sentences": [sent.text for sent in doc.sents],
+        "skills": extract_skills(doc),
+    }
+
+
+def parse_texts(texts: Iterable[str], batch_size: int = CV_NLP_BATCH_SIZE,
+                n_process: int = CV_NLP_PROCESSES) -> List[Dict[str, Any]]:
+    """Parsed entities/sentences/skills for each text, in order."""
+    return [doc_to_parse(doc) for doc in nlp.get().pipe(texts, batch_size=batch_size, n_process=n_process)]
+
+
+def parse_text(text: str) -> Dict[str, Any]:
+    return doc_to_parse(nlp.get()(text))
@@ -0,0 +1,206 @@
+"""Background CV parsing.
+
+upload_cv stores the file and a CV row with status "pending" and returns
+straight away. The parse runs in a process pool (PDF extraction and spaCy hold
+the GIL, so threads would still stall the API) and the worker records the
+outcome on the row: pending -> parsing -> done or failed. Only "done" CVs
+are used for recommendations. A row left in "parsing" for longer than
+CV_PARSE_TIMEOUT_SECONDS belongs to a worker that died and is claimed again.
+"""
+import datetime
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from sqlalchemy import and_, or_
+
+from database import SessionLocal
+from models import CV, CV_DONE, CV_FAILED, CV_PARSING, CV_PENDING
+from cv_storage import store_parsed
+from parse_cache import parse_cache
+
+CV_PARSE_WORKERS = int(os.getenv("CV_PARSE_WORKERS", "2"))
+# Times a CV is resubmitted after crashes of other parses before it is left for the next start
+CV_PARSE_MAX_RESUBMITS = int(os.getenv("CV_PARSE_MAX_RESUBMITS", "5"))
+# Longer than any parse can take within the page/character budget of document_extraction
+CV_PARSE_TIMEOUT_SECONDS = float(os.getenv("CV_PARSE_TIMEOUT_SECONDS", "900"))
+# Workers are started fresh rather than forked from the API process, whose threads may hold
+# locks (logging, DB pool, model loading) at fork time; forkserver is cheaper where it exists
+CV_PARSE_START_METHOD = os.getenv(
+    "CV_PARSE_START_METHOD", "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+# Placeholder until the parse finishes, so clients can rely on the keys being there
+EMPTY_PARSE = {"entities": {}, "sentences": [], "skills": []}
+
+logger = logging.getLogger(__name__)
+
+
+def claimable():
+    """Rows waiting for a parse: pending, or stuck in parsing after their worker died."""
+    stale = datetime.datetime.utcnow() - datetime.timedelta(seconds=CV_PARSE_TIMEOUT_SECONDS)
+    return or_(CV.status == CV_PENDING,
+               and_(CV.status == CV_PARSING, or_(CV.parse_started_at.is_(None), CV.parse_started_at < stale)))
+
+
+def run_parse(cv_id: int) -> Optional[int]:
+    """Parse one CV in a worker process; returns the owner's user id if it was parsed."""
+    # Imported here: the parser pulls in spaCy, which only the workers need
+    from cv_upload import parse_cv, parser_version
+
+    db = SessionLocal()
+    try:
+        # Claim the row so a CV resubmitted after a restart is parsed once
+        claimed = db.query(CV).filter(CV.id == cv_id, claimable()) \
+            .update({CV.status: CV_PARSING, CV.parse_started_at: datetime.datetime.utcnow()},
+                    synchronize_session=False)
+        db.commit()
+        cv = db.get(CV, cv_id) if claimed else None
+        if cv is None:
+            return None
+        version = parser_version()
+        parsed_data = parse_cache.get(db, cv.content_hash, version)
+        if parsed_data is None:
+            try:
+                parsed_data = parse_cv(cv.file_path, cv.file_type)
+            except Exception as e:
+                cv.status = CV_FAILED
+                cv.parse_error = str(e)[:1000]
+                db.commit()
+                return None
+            parse_cache.put(db, cv.content_hash, version, parsed_data)
+        store_parsed(cv, parsed_data)
+        cv.status = CV_DONE
+        cv.parse_error = None
+        db.commit()
+        return cv.user_id
+    finally:
+        db.close()
+
+
+class CVParsePool:
+    """Process pool running run_parse, started on first use.
+
+    A worker that dies (e.g. killed on a pathological file) breaks the whole
+    pool, and every parse queued on it fails with it. The pool is then
+    recreated: CVs that had not started yet are resubmitted, CVs that were
+    being parsed are retried one at a time in a single-worker pool, and only
+    a CV that also kills that worker is marked failed.
+    """
+
+    def __init__(self, max_workers: int = CV_PARSE_WORKERS):
+        self.max_workers = max_workers
+        # Keyed by "isolated": the shared pool and the single-worker pool for crash suspects
+        self._pools: Dict[bool, Optional[ProcessPoolExecutor]] = {False: None, True: None}
+        self._resubmits: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _executor(self, isolated: bool) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pools[isolated] is None:
+                self._pools[isolated] = ProcessPoolExecutor(
+                    max_workers=1 if isolated else self.max_workers,
+                    mp_context=multiprocessing.get_context(CV_PARSE_START_METHOD))
+            return self._pools[isolated]
+
+    def _discard(self, pool: ProcessPoolExecutor, isolated: bool):
+        with self._lock:
+            if self._pools[isolated] is pool:
+                self._pools[isolated] = None
+
+    def submit(self, cv_id: int, isolated: bool = False) -> Future:
+        pool = self._executor(isolated)
+        try:
+            future = pool.submit(run_parse, cv_id)
+        except BrokenProcessPool:
+            # Broke before its own callbacks replaced it
+            self._discard(pool, isolated)
+            pool = self._executor(isolated)
+            future = pool.submit(run_parse, cv_id)
+        future.add_done_callback(lambda done: self._finished(cv_id, done, pool, isolated))
+        return future
+
+    def _finished(self, cv_id: int, future: Future, pool: ProcessPoolExecutor, isolated: bool):
+        if future.cancelled():
+            # Shut down before it ran; the row stays pending and is resumed on the next start
+            return
+        broken = isinstance(future.exception(), BrokenProcessPool)
+        with self._lock:
+            resubmits = self._resubmits.pop(cv_id, 0) + 1
+            if broken and resubmits <= CV_PARSE_MAX_RESUBMITS:
+                self._resubmits[cv_id] = resubmits
+        try:
+            user_id = future.result()
+        except BrokenProcessPool as e:
+            self._discard(pool, isolated)
+            status = self._status(cv_id)
+            if resubmits > CV_PARSE_MAX_RESUBMITS:
+                # Workers keep dying (e.g. they can't start); resume_pending picks it up on the next start
+                logger.error(f"Giving up on CV {cv_id} for now, the parse pool keeps breaking: {str(e)}")
+            elif status == CV_PENDING:
+                # Queued behind the crash and never started
+                self.submit(cv_id, isolated)
+            elif status == CV_PARSING and not isolated:
+                # Running when a worker died, not necessarily the one that died
+                self._requeue(cv_id)
+                self.submit(cv_id, isolated=True)
+            elif status == CV_PARSING:
+                logger.error(f"Parsing CV {cv_id} crashed: {str(e)}")
+                self._mark_failed(cv_id, f"Parser crashed: {str(e)}")
+            return
+        except Exception as e:
+            logger.error(f"Parsing CV {cv_id} failed: {str(e)}")
+            self._mark_failed(cv_id, f"Parser failed: {str(e)}")
+            return
+        if user_id is not None:
+            # Imported here: cv_upload imports this module
+            from cv_upload import invalidate_cv_caches
+            invalidate_cv_caches(user_id)
+
+    def _status(self, cv_id: int) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            return db.query(CV.status).filter(CV.id == cv_id).scalar()
+        finally:
+            db.close()
+
+    def _requeue(self, cv_id: int):
+        db = SessionLocal()
+        try:
+            db.query(CV).filter(CV.id == cv_id, CV.status == CV_PARSING) \
+                .update({CV.status: CV_PENDING}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _mark_failed(self, cv_id: int, error: str):
+        db = SessionLocal()
+        try:
+            db.query(CV).filter(CV.id == cv_id, CV.status.in_([CV_PENDING, CV_PARSING])) \
+                .update({CV.status: CV_FAILED, CV.parse_error: error[:1000]}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def resume_pending(self):
+        """Queue CVs left pending, or abandoned mid-parse, by a previous run."""
+        db = SessionLocal()
+        try:
+            cv_ids = [cv_id for (cv_id,) in db.query(CV.id).filter(claimable())]
+        finally:
+            db.close()
+        for cv_id in cv_ids:
+            self.submit(cv_id)
+
+    def shutdown(self):
+        with self._lock:
+            for isolated, pool in self._pools.items():
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._pools[isolated] = None
+
+
+cv_parse_pool = CVParsePool()
@@ -0,0 +1,126 @@
+"""Split storage of parsed CV data.
+
+cvs.parsed_data keeps the small fields (entities, skills and anything else
+the profile needs); the bulky ones (every sentence of the document) go to
+cv_texts as compressed JSON, zstd when the zstandard package is installed
+and gzip otherwise. Skills are also written to cv_skills, one row per
+skill, so they can be counted and filtered in SQL. Rows written before this
+split still hold their sentences in parsed_data and are read as they are;
+run this module to move them:
+
+    python cv_storage.py --batch-size 500
+"""
+import argparse
+import gzip
+import json
+import os
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import CV, CVSkill, CVText
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# zstd or gzip; zstd falls back to gzip if zstandard isn't installed
+CV_TEXT_CODEC = os.getenv("CV_TEXT_CODEC", "zstd")
+BULKY_FIELDS = ("sentences",)
+MAX_SKILL_LENGTH = 100
+
+
+def compress(value: Any, codec: str = CV_TEXT_CODEC) -> Tuple[str, bytes]:
+    raw = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if codec == "zstd" and zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=9).compress(raw)
+    return "gzip", gzip.compress(raw, compresslevel=6)
+
+
+def decompress(codec: str, data: bytes) -> Any:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("CV text is zstd-compressed but the zstandard package is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == "gzip":
+        raw = gzip.decompress(data)
+    else:
+        raise ValueError(f"Unknown CV text codec: {codec}")
+    return json.loads(raw)
+
+
+def split_parsed(parsed_data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(small fields, bulky fields) of a parse result."""
+    small = {key: value for key, value in parsed_data.items() if key not in BULKY_FIELDS}
+    bulky = {key: parsed_data[key] for key in BULKY_FIELDS if key in parsed_data}
+    return small, bulky
+
+
+def set_skills(cv: CV, skills: Optional[Iterable[str]]):
+    # Lowercased: the MySQL collation would treat "Python" and "python" as the same key anyway
+    names = {str(skill).strip().lower()[:MAX_SKILL_LENGTH] for skill in skills or []}
+    cv.skill_rows = [CVSkill(skill=name) for name in sorted(names) if name]
+
+
+def store_parsed(cv: CV, parsed_data: Dict[str, Any]):
+    """Set a CV's parsed data across cvs.parsed_data, cv_texts and cv_skills (no commit)."""
+    small, bulky = split_parsed(parsed_data)
+    cv.parsed_data = small
+    if bulky:
+        codec, data = compress(bulky)
+        cv.text = CVText(codec=codec, data=data)
+    else:
+        cv.text = None
+    set_skills(cv, small.get("skills"))
+
+
+def full_parsed_data(cv: CV) -> Dict[str, Any]:
+    """parsed_data with the bulky fields loaded back in."""
+    parsed_data = dict(cv.parsed_data or {})
+    if cv.text is not None:
+        parsed_data.update(decompress(cv.text.codec, cv.text.data))
+    return parsed_data
+
+
+def cv_response(cv: CV) -> Dict[str, Any]:
+    """A CV row as returned by get-cv, with its full parsed data."""
+    response = {column.key: getattr(cv, column.key) for column in CV.__table__.columns}
+    response["parsed_data"] = full_parsed_data(cv)
+    return response
+
+
+def migrate_legacy(db: Session, batch_size: int = 500) -> int:
+    """Move sentences of rows written before the split out of parsed_data; returns the number moved."""
+    moved = 0
+    last_id = 0
+    while True:
+        cvs = db.query(CV).filter(CV.id > last_id, func.json_extract(CV.parsed_data, "$.sentences").isnot(None)) \
+            .order_by(CV.id).limit(batch_size).all()
+        if not cvs:
+            return moved
+        for cv in cvs:
+            store_parsed(cv, full_parsed_data(cv))
+        db.commit()
+        moved += len(cvs)
+        last_id = cvs[-1].id
+        print(f"moved {moved} CVs, last id {last_id}")
+
+
+def main():
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Move parsed CV sentences into compressed cv_texts rows.")
+    parser.add_argument("--batch-size", type=int, default=500, help="CVs per transaction")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(f"Done: {migrate_legacy(db, args.batch_size)} CVs moved")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,52 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Response, status
 from fastapi.responses import JSONResponse, FileResponse
-import spacy
 import os
+import hashlib
 import tempfile
-from typing import Dict, Any, List
+from typing import BinaryIO, Dict, Any, List, Optional, Tuple
 from auth import get_current_user, User
 from database import SessionLocal
-from models import CV
+from models import CV, CV_DONE, CV_PENDING
+from profile_cache import profile_cache
+from recommendation_cache import recommendation_cache
+from incremental_recommendations import recommendation_heaps
+from cv_parsing import cv_parse_pool, EMPTY_PARSE
+from parse_cache import parse_cache
+from cv_storage import cv_response, set_skills, store_parsed
 from sqlalchemy.orm import Session
-import docx2txt
-import PyPDF2
 import json
 from pydantic import BaseModel
+from cv_nlp import parse_text, pipeline_version
+from document_extraction import extract_text
 
-# Load spaCy model
-nlp = spacy.load("en_core_web_sm")
+# Bump when parse_cv or extract_skills change what they return; cached parses of older versions are ignored.
+# Edits to the skills taxonomy file change pipeline_version by themselves
+PARSER_VERSION = "4"
+
+def parser_version() -> str:
+    """Parser version plus the spaCy model/pipeline it runs, without loading the model."""
+    return f"{PARSER_VERSION}/{pipeline_version()}"
 
 # Create router
 router = APIRouter()
 
 UPLOAD_DIR = "uploads"
+CV_EXTENSIONS = (".pdf", ".docx", ".txt")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Uploads are streamed to disk in chunks of this size and rejected with 413 past the limit
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+
+# list-cvs returns these by default; anything else has to be asked for with fields=
+CV_SUMMARY_COLUMNS = (CV.id, CV.filename, CV.file_type, CV.created_at, CV.status)
+# Pieces of parsed_data are extracted by the database, so the rest of the JSON isn't sent
+CV_PARSED_FIELDS = {
+    "skills": CV.parsed_data["skills"],
+    "entities": CV.parsed_data["entities"],
+}
+CV_LIST_FIELDS = {**CV_PARSED_FIELDS, "parsed_data": CV.parsed_data, "parse_error": CV.parse_error}
+CV_LIST_DEFAULT_LIMIT = 50
+CV_LIST_MAX_LIMIT = 200
 
 def get_db():
     db = SessionLocal()
@@ -32,12 +58,125 @@ def get_db():
 class SkillsUpdate(BaseModel):
     skills: List[str]
 
+class _StoredFileWriter:
+    """Streams chunks to a temp file in UPLOAD_DIR, hashing them and enforcing MAX_UPLOAD_BYTES.
+
+    Used as a context manager: the temp file is removed unless finish() moved it into storage.
+    """
+
+    def __init__(self, extension: str):
+        self.extension = extension
+        self._digest = hashlib.sha256()
+        self._size = 0
+        fd, self._tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def __enter__(self) -> "_StoredFileWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def write(self, chunk: bytes):
+        """Raises ValueError once the file grows past MAX_UPLOAD_BYTES."""
+        self._size += len(chunk)
+        if self._size > MAX_UPLOAD_BYTES:
+            raise ValueError(f"File is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+        self._digest.update(chunk)
+        self._file.write(chunk)
+
+    def finish(self) -> Tuple[str, str]:
+        """Move the file to its content-addressed path, or drop it if that exists; returns
+        (path, sha256 hex digest)."""
+        self._file.close()
+        content_hash = self._digest.hexdigest()
+        save_dir = os.path.join(UPLOAD_DIR, content_hash[:2])
+        os.makedirs(save_dir, exist_ok=True)
+        save_path = os.path.join(save_dir, content_hash + self.extension)
+        if os.path.exists(save_path):
+            os.remove(self._tmp_path)
+        else:
+            os.replace(self._tmp_path, save_path)
+        return save_path, content_hash
+
+async def store_upload(file: UploadFile, extension: str) -> Tuple[str, str]:
+    """Stream an upload to content-addressed storage (uploads/ab/<sha256><ext>).
+
+    The SHA-256 is computed while writing, so identical files end up at the
+    same path and are kept once. Returns (path, sha256 hex digest).
+    """
+    with _StoredFileWriter(extension) as writer:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            try:
+                writer.write(chunk)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+        return writer.finish()
+
+def store_file(source: BinaryIO, extension: str) -> Tuple[str, str]:
+    """store_upload for a local binary file object (bulk import); raises ValueError past MAX_UPLOAD_BYTES."""
+    with _StoredFileWriter(extension) as writer:
+        for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+            writer.write(chunk)
+        return writer.finish()
+
+def invalidate_cv_caches(user_id: int, cv_id: int = None):
+    """Drop cached profile embeddings, ranked recommendations and top-k heaps after a CV change"""
+    if cv_id is None:
+        profile_cache.invalidate_user(user_id)
+    else:
+        profile_cache.invalidate_cv(cv_id)
+    recommendation_cache.invalidate_user(user_id)
+    recommendation_heaps.invalidate_user(user_id)
+
 @router.get("/list-cvs/")
 async def list_cvs(
+    response: Response,
+    skip: int = 0,
+    limit: int = CV_LIST_DEFAULT_LIMIT,
+    fields: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    cvs = db.query(CV).filter(CV.user_id == current_user.id).all()
+    """Newest first. Only the summary columns are read unless fields= asks for more,
+    e.g. fields=skills or fields=parsed_data; parsed fields come back under parsed_data.
+    Sentences are only returned by get-cv. When more CVs follow, the X-Next-Skip header
+    holds the skip of the next page."""
+    requested = [field.strip() for field in fields.split(",") if field.strip()] if fields else []
+    unknown = [field for field in requested if field not in CV_LIST_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(CV_LIST_FIELDS)}"
+        )
+    skip = max(skip, 0)
+    limit = max(1, min(limit, CV_LIST_MAX_LIMIT))
+    columns = [*CV_SUMMARY_COLUMNS, *(CV_LIST_FIELDS[field].label(field) for field in requested)]
+    # One extra row tells whether there is a next page without counting them all
+    rows = db.query(*columns) \
+        .filter(CV.user_id == current_user.id) \
+        .order_by(CV.created_at.desc(), CV.id.desc()) \
+        .offset(skip) \
+        .limit(limit + 1) \
+        .all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Skip"] = str(skip + limit)
+
+    cvs = []
+    for row in rows:
+        cv = {column.key: getattr(row, column.key) for column in CV_SUMMARY_COLUMNS}
+        for field in requested:
+            if field in CV_PARSED_FIELDS:
+                cv.setdefault("parsed_data", {})[field] = getattr(row, field)
+            else:
+                cv[field] = getattr(row, field)
+        cvs.append(cv)
     return cvs
 
 @router.get("/get-cv/{cv_id}/")
@@ -49,7 +188,7 @@ async def get_cv(
     cv = db.query(CV).filter(CV.id == cv_id, CV.user_id == current_user.id).first()
     if not cv:
         raise HTTPException(status_code=404, detail="CV not found")
-    return cv
+    return cv_response(cv)
 
 @router.put("/update-cv/{cv_id}/")
 async def update_cv(
@@ -61,15 +200,17 @@ async def update_cv(
     cv = db.query(CV).filter(CV.id == cv_id, CV.user_id == current_user.id).first()
     if not cv:
         raise HTTPException(status_code=404, detail="CV not found")
+    if cv.status != CV_DONE:
+        raise HTTPException(status_code=409, detail="CV has not been parsed yet")
     
-    # Update the skills in the parsed_data
-    parsed_data = cv.parsed_data
-    parsed_data["skills"] = skills_update.skills
-    cv.parsed_data = parsed_data
+    # Update the skills in the parsed_data (a new dict, so the JSON column is marked changed)
+    cv.parsed_data = {**cv.parsed_data, "skills": skills_update.skills}
+    set_skills(cv, skills_update.skills)
     
     db.commit()
+    invalidate_cv_caches(current_user.id, cv.id)
     db.refresh(cv)
-    return cv
+    return cv_response(cv)
 
 @router.post("/upload-cv/")
 async def upload_cv(
@@ -77,77 +218,57 @@ async def upload_cv(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not file.filename.endswith((".pdf", ".docx", ".txt")):
+    if not file.filename.endswith(CV_EXTENSIONS):
         raise HTTPException(status_code=400, detail="File must be a PDF, DOCX, or TXT file.")
 
-    # Save the uploaded file permanently
-    save_path = os.path.join(UPLOAD_DIR, f"user{current_user.id}_{file.filename}")
-    with open(save_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
-
-    # Parse the CV as before (use save_path)
-    file_type = os.path.splitext(file.filename)[1][1:]
-    cv_data = parse_cv(save_path, file_type)
+    # Save the uploaded file permanently; identical files share one copy
+    extension = os.path.splitext(file.filename)[1].lower()
+    save_path, content_hash = await store_upload(file, extension)
 
+    # A file parsed before by the same parser version is not parsed again; anything
+    # else is parsed in the background and the client polls parse-status with the returned id
+    file_type = extension[1:]
+    cached = parse_cache.get(db, content_hash, parser_version())
     db_cv = CV(
         user_id=current_user.id,
         filename=file.filename,
         file_type=file_type,
-        parsed_data=cv_data,
-        file_path=save_path  # Save the file path
+        file_path=save_path,  # Save the file path
+        content_hash=content_hash,
+        status=CV_DONE if cached is not None else CV_PENDING
     )
+    store_parsed(db_cv, cached if cached is not None else EMPTY_PARSE)
     db.add(db_cv)
     db.commit()
     db.refresh(db_cv)
+    if cached is not None:
+        # The new CV becomes the latest one, so the old profile embedding is stale
+        invalidate_cv_caches(current_user.id)
+    else:
+        cv_parse_pool.submit(db_cv.id)
 
-    return JSONResponse(content=cv_data)
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if cached is not None else status.HTTP_202_ACCEPTED,
+        content={"cv_id": db_cv.id, "parse_job_id": db_cv.id, "status": db_cv.status}
+    )
+
+@router.get("/parse-status/{cv_id}/")
+async def parse_status(
+    cv_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    cv = db.query(CV.id, CV.status, CV.parse_error).filter(CV.id == cv_id, CV.user_id == current_user.id).first()
+    if not cv:
+        raise HTTPException(status_code=404, detail="CV not found")
+    return {"cv_id": cv.id, "status": cv.status, "error": cv.parse_error}
 
 def parse_cv(file_path: str, file_type: str) -> Dict[str, Any]:
-    # Read the file content based on file type
-    if file_type == 'txt':
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    elif file_type == 'docx':
-        content = docx2txt.process(file_path)
-    elif file_type == 'pdf':
-        with open(file_path, 'rb') as f:
-            pdf_reader = PyPDF2.PdfReader(f)
-            content = ""
-            for page in pdf_reader.pages:
-                content += page.extract_text()
-    else:
-        raise ValueError(f"Unsupported file type: {file_type}")
-    
-    # Process the content with spaCy
-    doc = nlp(content)
-    
-    # Extract entities (e.g., names, organizations, skills)
-    entities = {ent.label_: ent.text for ent in doc.ents}
-    
-    # Extract sentences for further processing
-    sentences = [sent.text for sent in doc.sents]
-    
-    # Extract skills (custom logic - you might want to enhance this)
-    skills = extract_skills(doc)
-    
-    # Return parsed data
-    return {
-        "entities": entities,
-        "sentences": sentences,
-        "skills": skills
-    }
-
-def extract_skills(doc) -> list:
-    # This is a simple example - you might want to enhance this with a proper skills database
-    skill_keywords = ['python', 'java', 'javascript', 'react', 'node', 'sql', 'aws', 'docker']
-    skills = []
-    
-    for token in doc:
-        if token.text.lower() in skill_keywords:
-            skills.append(token.text.lower())
-    
-    return list(set(skills))  # Remove duplicates
+    # Read the file content based on file type (page and character budget in document_extraction)
+    content = extract_text(file_path, file_type)
+
+    # Process the content with spaCy (see cv_nlp for the pipeline)
+    return parse_text(content)
 
 @router.delete("/delete-cv/{cv_id}/", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_cv(
@@ -160,6 +281,7 @@ async def delete_cv(
         raise HTTPException(status_code=404, detail="CV not found")
     db.delete(cv)
     db.commit()
+    invalidate_cv_caches(current_user.id, cv_id)
     return
 
 @router.get("/download-cv/{cv_id}/")
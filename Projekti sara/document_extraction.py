@@ -0,0 +1,55 @@
+"""Text extraction from uploaded CV files.
+
+PDF pages are collected in a list and joined once. Only the first
+CV_MAX_PAGES pages and CV_MAX_CHARS characters are kept, so an oversized
+upload cannot tie up a parse worker. Extraction runs serially inside the
+worker: the callers (the CV parse pool, import_cvs) already parallelize
+across documents, and splitting one document's pages over more processes
+was slower within the page budget (see benchmarks/RESULTS.md).
+"""
+import logging
+import os
+from typing import List
+
+import docx2txt
+import PyPDF2
+
+CV_MAX_PAGES = int(os.getenv("CV_MAX_PAGES", "30"))
+CV_MAX_CHARS = int(os.getenv("CV_MAX_CHARS", "100000"))
+
+logger = logging.getLogger(__name__)
+
+
+def _page_texts(reader: PyPDF2.PdfReader, start: int, stop: int, max_chars: int) -> List[str]:
+    pages = []
+    size = 0
+    for number in range(start, min(stop, len(reader.pages))):
+        text = reader.pages[number].extract_text() or ""
+        pages.append(text)
+        size += len(text)
+        if size >= max_chars:
+            break
+    return pages
+
+
+def extract_pdf(file_path: str, max_pages: int = CV_MAX_PAGES, max_chars: int = CV_MAX_CHARS) -> str:
+    with open(file_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        n_pages = len(reader.pages)
+        if n_pages > max_pages:
+            logger.warning(f"{file_path} has {n_pages} pages, extracting the first {max_pages}")
+            n_pages = max_pages
+        pages = _page_texts(reader, 0, n_pages, max_chars)
+    return "\n".join(pages)[:max_chars]
+
+
+def extract_text(file_path: str, file_type: str, max_chars: int = CV_MAX_CHARS) -> str:
+    if file_type == "txt":
+        with open(file_path, "r", encoding="utf-8") as f:
+            return f.read(max_chars)
+    if file_type == "docx":
+        return docx2txt.process(file_path)[:max_chars]
+    if file_type == "pdf":
+        return extract_pdf(file_path, max_chars=max_chars)
+    raise ValueError(f"Unsupported file type: {file_type}")
+
@@ -0,0 +1,220 @@
+"""Shared embedding service.
+
+One process holds the encoder (see encoders.ENCODER_BACKEND) and every API
+worker talks to it over a Unix socket, so the model is loaded once per host
+instead of once per uvicorn worker. Concurrent encode requests are merged into micro-batches
+before reaching model.encode.
+
+Start it next to the API and point the workers at it:
+
+    python embedding_service.py
+    EMBEDDING_SERVICE_SOCKET=/tmp/job-embeddings.sock uvicorn main:app --workers 4
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Union
+
+import numpy as np
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+# Unset means each worker loads the model in-process
+EMBEDDING_SERVICE_SOCKET = os.getenv("EMBEDDING_SERVICE_SOCKET")
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+EMBEDDING_CLIENT_TIMEOUT = float(os.getenv("EMBEDDING_CLIENT_TIMEOUT", "30"))
+
+logger = logging.getLogger(__name__)
+
+# Frames are a 4-byte big-endian length followed by the payload. Requests are
+# JSON {"texts": [...]}; responses start with b"0" + (rows, dim) + float32
+# data, or b"1" + an error message. {"info": true} is answered with b"0" +
+# JSON {"backend": ..., "model_version": ...} describing the loaded encoder.
+_LENGTH = struct.Struct(">I")
+_SHAPE = struct.Struct(">II")
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("Embedding service closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+class MicroBatcher:
+    """Collects concurrent encode calls into one model call.
+
+    A batch is flushed when it holds max_batch texts or when the first request
+    in it has waited max_wait_ms, whichever comes first.
+    """
+
+    def __init__(self, encode_fn, max_batch: int = EMBEDDING_MAX_BATCH, max_wait_ms: float = EMBEDDING_MAX_WAIT_MS):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue: asyncio.Queue = asyncio.Queue()
+        # A single model thread: batches are serialized while the next one fills up
+        self._model_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="encode")
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = await loop.run_in_executor(self._model_thread, self.encode_fn, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            start = 0
+            for item_texts, future in batch:
+                if not future.done():
+                    future.set_result(vectors[start:start + len(item_texts)])
+                start += len(item_texts)
+
+
+async def _handle_client(batcher: MicroBatcher, info: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            try:
+                (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                request = json.loads(await reader.readexactly(length))
+            except asyncio.IncompleteReadError:
+                break
+            if request.get("info"):
+                writer.write(_LENGTH.pack(len(info) + 1) + b"0" + info)
+                await writer.drain()
+                continue
+            try:
+                vectors = np.ascontiguousarray(await batcher.encode(request["texts"]), dtype=np.float32)
+                payload = b"0" + _SHAPE.pack(*vectors.reshape(len(request["texts"]), -1).shape) + vectors.tobytes()
+            except Exception as e:
+                logger.error(f"Embedding request failed: {str(e)}")
+                payload = b"1" + str(e).encode("utf-8")
+            writer.write(_LENGTH.pack(len(payload)) + payload)
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(socket_path: str):
+    # Imported here: encoders depends on this module for EMBEDDING_MODEL_NAME
+    from encoders import load_encoder
+
+    model = load_encoder()
+    logger.info(f"Loaded {model.model_version}")
+    batcher = MicroBatcher(lambda texts: model.encode(texts, batch_size=EMBEDDING_MAX_BATCH))
+    info = json.dumps({"backend": model.backend, "model_version": model.model_version}).encode("utf-8")
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = await asyncio.start_unix_server(lambda r, w: _handle_client(batcher, info, r, w), path=socket_path)
+    batch_task = asyncio.create_task(batcher.run())
+    logger.info(f"Embedding service listening on {socket_path}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+
+
+class EmbeddingServiceClient:
+    """Drop-in for SentenceTransformer.encode that calls the shared service.
+
+    Each thread keeps its own connection so requests from different inference
+    threads reach the service concurrently and can share a batch.
+    """
+
+    def __init__(self, socket_path: str = EMBEDDING_SERVICE_SOCKET, timeout: float = EMBEDDING_CLIENT_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._info = None
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+            # A restarted service may run another model, whose vectors must not mix with ours
+            info = json.loads(self._call({"info": True}))
+            if self._info is None:
+                self._info = info
+            elif info["model_version"] != self._info["model_version"]:
+                self._close()
+                raise RuntimeError(f"Embedding service now runs {info['model_version']} instead of "
+                                   f"{self._info['model_version']}; restart this worker")
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _call(self, request: dict) -> bytes:
+        sock = self._connection()
+        body = json.dumps(request).encode("utf-8")
+        sock.sendall(_LENGTH.pack(len(body)) + body)
+        (length,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+        payload = _recv_exact(sock, length)
+        if payload[:1] != b"0":
+            raise RuntimeError(f"Embedding service error: {payload[1:].decode('utf-8', 'replace')}")
+        return payload[1:]
+
+    def info(self) -> Dict[str, str]:
+        """Backend and model_version of the encoder the service ran when first reached."""
+        if self._info is None:
+            self._connection()
+        return self._info
+
+    def _request(self, texts: List[str]) -> np.ndarray:
+        payload = self._call({"texts": texts})
+        rows, dim = _SHAPE.unpack(payload[:_SHAPE.size])
+        return np.frombuffer(payload[_SHAPE.size:], dtype=np.float32).reshape(rows, dim)
+
+    def encode(self, texts: Union[str, List[str]], **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        try:
+            vectors = self._request(batch)
+        except (ConnectionError, OSError):
+            # The service may have restarted; reconnect once
+            self._close()
+            vectors = self._request(batch)
+        return vectors[0] if single else vectors
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(EMBEDDING_SERVICE_SOCKET or "/tmp/job-embeddings.sock"))
@@ -0,0 +1,550 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+EMBEDDINGS_DIR = os.getenv("EMBEDDINGS_DIR", "embeddings")
+os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
+
+# In-memory format used for first-pass scoring; the float32 matrix stays on disk
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float32")
+STORE_DTYPES = ("float32", "float16", "int8")
+# Rows converted to float32 at a time when scanning or rewriting the matrix
+CHUNK_ROWS = 65536
+# Compact rows widened to float32 at a time when scoring; small enough to stay in cache
+SCORE_CHUNK_ROWS = 512
+# Share of removed/overwritten rows at which the files are rewritten without them
+COMPACT_DEAD_FRACTION = float(os.getenv("EMBEDDING_STORE_COMPACT_DEAD_FRACTION", "0.25"))
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so cosine similarity becomes a plain dot product."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of the k largest scores in each row, best first.
+
+    argpartition selects the winners in linear time, so only k entries per
+    row are actually sorted.
+    """
+    scores = np.atleast_2d(scores)
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def open_rows(path: str, dtype, rows: int, dim: Optional[int] = None, mode: str = "r") -> np.ndarray:
+    """Memory map of the first rows of a raw row file; anything past them is ignored."""
+    shape = (rows,) if dim is None else (rows, dim)
+    if rows == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+
+def append_rows(path: str, array: np.ndarray, at_row: int):
+    """Write array as rows at_row.. of a raw row file, dropping whatever an interrupted write left there."""
+    array = np.ascontiguousarray(array)
+    row_bytes = array.itemsize * int(np.prod(array.shape[1:], dtype=np.int64))
+    with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+        f.truncate(at_row * row_bytes)
+        f.seek(at_row * row_bytes)
+        f.write(array.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def extend_rows(buffer: Optional[np.ndarray], n: int, extra: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Write extra after the first n rows of buffer, reallocating with ~1/8 spare rows when full.
+
+    Returns (buffer, view of its first n + len(extra) rows); views handed out
+    earlier keep seeing their own rows.
+    """
+    needed = n + len(extra)
+    if buffer is None or len(buffer) < needed:
+        grown = np.empty((needed + needed // 8 + 1024,) + extra.shape[1:], dtype=extra.dtype)
+        if n:
+            grown[:n] = buffer[:n]
+        buffer = grown
+    buffer[n:needed] = extra
+    return buffer, buffer[:needed]
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Compact copy of normalized vectors plus, for int8, the per-vector scale.
+
+    int8 rows are scaled so their largest component maps to 127; a dot product
+    against the int8 row times its scale approximates the float32 score.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    peak = np.abs(vectors).max(axis=1) if len(vectors) else np.empty(0, dtype=np.float32)
+    peak[peak == 0] = 1.0
+    codes = np.round(vectors * (127.0 / peak)[:, None]).astype(np.int8)
+    return codes, (peak / 127.0).astype(np.float32)
+
+
+class StoreSnapshot:
+    """The matrix, its row ids and the id -> row lookup of one state of the store.
+
+    Replaced as a whole on every change, so a lock-free reader that takes it
+    once never pairs rows of one state with ids or scales of another.
+    """
+    __slots__ = ("generation", "vectors", "compact", "scales", "row_ids", "dead_rows", "sorted_ids", "sorted_rows")
+
+    def __init__(self, generation: int, vectors: np.ndarray, compact: Optional[np.ndarray], scales: Optional[np.ndarray],
+                 row_ids: np.ndarray, sorted_ids: np.ndarray, sorted_rows: np.ndarray):
+        self.generation = generation
+        self.vectors = vectors
+        self.compact = compact
+        self.scales = scales
+        self.row_ids = row_ids
+        self.dead_rows = np.flatnonzero(row_ids < 0)
+        # Sorted live ids and their rows, for vectorized id -> row lookups (a dict would
+        # cost ~100 bytes per job at million-job scale)
+        self.sorted_ids = sorted_ids
+        self.sorted_rows = sorted_rows
+
+
+class JobEmbeddingStore:
+    """L2-normalized job embeddings in append-only row files committed by a manifest.
+
+    A generation of the store is a float32 matrix file and a parallel job id
+    file (raw rows, so they can be memory-mapped; workers only page in the rows
+    they touch), plus with dtype "float16" or "int8" a compact copy that is
+    what gets scanned, the float32 rows only being read to re-rank the best
+    candidates. Changes append rows; removed and overwritten rows are
+    tombstoned (job id -1) in place. job_store.json, replaced last, holds the
+    generation, how many rows are committed and the encoder model_version the
+    vectors came from, so a crash or a concurrent load never sees half a
+    change. Once COMPACT_DEAD_FRACTION of the rows are
+    dead the live ones are copied into the next generation.
+    """
+
+    def __init__(self, directory: str = EMBEDDINGS_DIR, dtype: str = EMBEDDING_STORE_DTYPE):
+        if dtype not in STORE_DTYPES:
+            raise ValueError(f"Unknown embedding store dtype: {dtype}")
+        self.dtype = dtype
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, "job_store.json")
+        self.lock_path = os.path.join(directory, "job_store.lock")
+        self._manifest = {"generation": 0, "rows": 0, "dim": 0, "serial": 0, "compact": {}}
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        # Job id of every row, -1 for removed and overwritten rows; ids holds the live ones
+        self.row_ids = np.empty(0, dtype=np.int64)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.compact: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        # Arrays the compact copy and the scales are views of, with room to append
+        self._compact_buffer = self._scales_buffer = None
+        if self.quantized:
+            self.compact, self.scales = quantize(self.vectors, dtype)
+        # What searches read; writers build the next state on the attributes above under
+        # the lock, then publish it here in _reindex
+        self.snapshot = StoreSnapshot(0, self.vectors, self.compact, self.scales, self.row_ids, self.ids, self.ids)
+        # Bumped on every change so indexes built on top can tell they are stale
+        self.version = 0
+        self._lock = threading.RLock()
+        self._loaded_mtime = None
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, job_id: int) -> bool:
+        return len(self.rows_for([job_id])) > 0
+
+    def _path(self, kind: str, generation: Optional[int] = None) -> str:
+        generation = self._manifest["generation"] if generation is None else generation
+        names = {"vectors": f"job_vectors.{generation}.float32", "ids": f"job_ids.{generation}.int64",
+                 "float32": f"job_vectors.{generation}.float32", "float16": f"job_vectors.{generation}.float16", "int8": f"job_vectors.{generation}.int8",
+                 "scales": f"job_vectors.{generation}.int8_scales"}
+        return os.path.join(self.directory, names[kind])
+
+    @property
+    def vectors_path(self) -> str:
+        return self._path("vectors")
+
+    @property
+    def model_version(self) -> Optional[str]:
+        """Encoder version the stored vectors were produced by (None if unknown)."""
+        return self._manifest.get("model_version")
+
+    @property
+    def n_rows(self) -> int:
+        """Rows in the matrix, dead ones included."""
+        return len(self.row_ids)
+
+    def _reindex(self):
+        row_ids = self.row_ids
+        sorted_rows = np.argsort(row_ids, kind="stable")
+        sorted_ids = row_ids[sorted_rows]
+        # An id can be on two rows if a writer stopped between appending its new vector
+        # and tombstoning the old one; the later row wins
+        superseded = sorted_rows[:-1][(sorted_ids[:-1] == sorted_ids[1:]) & (sorted_ids[:-1] >= 0)]
+        if len(superseded):
+            row_ids = row_ids.copy()
+            row_ids[superseded] = -1
+            sorted_rows = np.argsort(row_ids, kind="stable")
+            sorted_ids = row_ids[sorted_rows]
+        live = sorted_ids >= 0
+        self.row_ids = row_ids
+        self.ids = row_ids[row_ids >= 0]
+        self.snapshot = StoreSnapshot(self._manifest["generation"], self.vectors, self.compact, self.scales, row_ids,
+                                      sorted_ids[live], sorted_rows[live])
+        self.version += 1
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    @property
+    def quantized(self) -> bool:
+        return self.dtype != "float32"
+
+    def memory_bytes(self) -> int:
+        """Bytes scanned by first-pass scoring (the float32 rows stay on disk when quantized)."""
+        if not self.quantized:
+            return self.vectors.nbytes
+        return self.compact.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def _mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.manifest_path)
+        except OSError:
+            return None
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self, manifest: dict):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+        self._manifest = manifest
+        self._loaded_mtime = self._mtime()
+
+    def load(self):
+        with self._lock:
+            mtime = self._mtime()
+            manifest = self._read_manifest()
+            if manifest is None:
+                self._import_legacy()
+                manifest = self._read_manifest()
+            if manifest is None:
+                return
+            try:
+                self._open(manifest)
+            except (FileNotFoundError, ValueError):
+                # The generation was compacted away after the manifest was read; keep what we have
+                return
+            self._loaded_mtime = mtime
+
+    def _import_legacy(self):
+        """Move the job_vectors.npy/job_ids.npy pair written before the manifest into a first generation."""
+        legacy = {name: os.path.join(self.directory, f"{name}.npy") for name in
+                  ("job_vectors", "job_ids", "job_vectors.float16", "job_vectors.int8", "job_vectors.int8_scales")}
+        if not (os.path.exists(legacy["job_vectors"]) and os.path.exists(legacy["job_ids"])):
+            return
+        vectors = np.load(legacy["job_vectors"], mmap_mode="r")
+        ids = np.load(legacy["job_ids"])
+        if len(ids) != len(vectors):
+            return
+        with self._write_lock():
+            if self._read_manifest() is not None:
+                return
+            for start in range(0, len(vectors), CHUNK_ROWS):
+                append_rows(self._path("vectors", 0), np.asarray(vectors[start:start + CHUNK_ROWS]), start)
+            append_rows(self._path("ids", 0), ids, 0)
+            self._write_manifest({"generation": 0, "rows": len(ids), "dim": vectors.shape[1], "serial": 1, "compact": {}})
+        del vectors
+        for path in legacy.values():
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _open(self, manifest: dict):
+        generation, rows, dim = manifest["generation"], manifest["rows"], manifest["dim"]
+        vectors = open_rows(self._path("vectors", generation), np.float32, rows, dim)
+        row_ids = np.array(open_rows(self._path("ids", generation), np.int64, rows))
+        compact = scales = None
+        if self.quantized:
+            # Rows already held are reused when only new rows were appended since
+            reuse = generation == self._manifest["generation"] and dim == self.dim and rows >= self.n_rows
+            compact, scales = self._load_compact(manifest, vectors, self.n_rows if reuse else 0)
+        self.vectors = vectors
+        self.row_ids = row_ids
+        self.compact, self.scales = compact, scales
+        self._compact_buffer, self._scales_buffer = compact, scales
+        self._manifest = manifest
+        self._reindex()
+
+    def _load_compact(self, manifest: dict, vectors: np.ndarray, reuse: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        rows, dim = manifest["rows"], manifest["dim"]
+        int8 = self.dtype == "int8"
+        codes = [self.compact[:reuse] if reuse else np.empty((0, dim), dtype=self.dtype)]
+        scales = [self.scales[:reuse] if reuse and int8 else np.empty(0, dtype=np.float32)]
+        # Rows the writer saved in this dtype are read back; the rest (another dtype wrote
+        # them) are quantized from the float32 rows
+        saved = min(manifest["compact"].get(self.dtype, 0), rows)
+        if saved > reuse:
+            codes.append(np.array(open_rows(self._path(self.dtype, manifest["generation"]), self.dtype, saved, dim)[reuse:]))
+            if int8:
+                scales.append(np.array(open_rows(self._path("scales", manifest["generation"]), np.float32, saved)[reuse:]))
+        for start in range(max(saved, reuse), rows, CHUNK_ROWS):
+            part_codes, part_scales = quantize(vectors[start:min(start + CHUNK_ROWS, rows)], self.dtype)
+            codes.append(part_codes)
+            scales.append(part_scales)
+        return np.concatenate(codes), (np.concatenate(scales) if int8 else None)
+
+    def refresh(self) -> bool:
+        """Reload from disk if another process committed a change; True if anything was reloaded."""
+        mtime = self._mtime()
+        if mtime is not None and mtime != self._loaded_mtime:
+            version = self.version
+            self.load()
+            return self.version != version
+        return False
+
+    @contextmanager
+    def _write_lock(self):
+        """Serializes writers across threads and, where flock exists, processes; the caller
+        then works on the latest committed state."""
+        with self._lock:
+            if fcntl is None:
+                self._catch_up()
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._catch_up()
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _catch_up(self):
+        manifest = self._read_manifest()
+        if manifest is not None and manifest["serial"] != self._manifest["serial"]:
+            self._open(manifest)
+            self._loaded_mtime = self._mtime()
+
+    def _lookup(self, job_ids: np.ndarray, snapshot: StoreSnapshot):
+        """Rows of job_ids (meaningless where absent) plus a mask of which ids are present."""
+        sorted_ids, sorted_rows = snapshot.sorted_ids, snapshot.sorted_rows
+        if len(sorted_ids) == 0:
+            return np.zeros(len(job_ids), dtype=np.int64), np.zeros(len(job_ids), dtype=bool)
+        positions = np.searchsorted(sorted_ids, job_ids)
+        positions[positions == len(sorted_ids)] = 0
+        return sorted_rows[positions], sorted_ids[positions] == job_ids
+
+    def rows_for(self, job_ids: Iterable[int], snapshot: Optional[StoreSnapshot] = None) -> np.ndarray:
+        """Matrix rows of the given job ids (in snapshot, the current state if None); unknown ids are dropped."""
+        job_ids = np.fromiter(job_ids, dtype=np.int64) if not isinstance(job_ids, np.ndarray) else job_ids.astype(np.int64)
+        rows, found = self._lookup(job_ids, snapshot or self.snapshot)
+        return rows[found]
+
+    def overwritten_between(self, before: StoreSnapshot, after: StoreSnapshot) -> np.ndarray:
+        """Ids live in both snapshots whose vector was replaced in between."""
+        common = np.intersect1d(before.sorted_ids, after.sorted_ids, assume_unique=True)
+        rows_before, rows_after = self.rows_for(common, before), self.rows_for(common, after)
+        if before.generation == after.generation:
+            # Rows are only appended within a generation, so a replaced vector has a new row
+            return common[rows_before != rows_after]
+        # Compaction renumbered the rows: compare the vectors themselves
+        changed = np.zeros(len(common), dtype=bool)
+        for start in range(0, len(common), CHUNK_ROWS):
+            stop = start + CHUNK_ROWS
+            changed[start:stop] = np.any(np.asarray(before.vectors[rows_before[start:stop]]) !=
+                                         np.asarray(after.vectors[rows_after[start:stop]]), axis=1)
+        return common[changed]
+
+    def get(self, job_ids: Iterable[int]) -> np.ndarray:
+        snapshot = self.snapshot
+        return np.asarray(snapshot.vectors[self.rows_for(job_ids, snapshot)], dtype=np.float32)
+
+    def scores(self, queries: np.ndarray, rows: Optional[np.ndarray] = None,
+               snapshot: Optional[StoreSnapshot] = None) -> np.ndarray:
+        """First-pass scores of normalized queries against the given rows of snapshot (all
+        rows if None, dead ones scoring -inf).
+
+        Runs on the compact copy when the store is quantized: its rows are
+        widened SCORE_CHUNK_ROWS at a time into one reused float32 buffer for
+        the matrix product (numpy has no fast float16 or int8 product), and
+        int8 scores are then multiplied by the per-row scales.
+        """
+        snapshot = snapshot or self.snapshot
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        matrix = snapshot.compact if self.quantized else snapshot.vectors
+        dead_rows = snapshot.dead_rows
+        n = len(matrix) if rows is None else len(rows)
+        out = np.empty((len(queries), n), dtype=np.float32)
+        if not self.quantized:
+            for start in range(0, n, CHUNK_ROWS):
+                stop = min(start + CHUNK_ROWS, n)
+                selected = slice(start, stop) if rows is None else rows[start:stop]
+                out[:, start:stop] = queries @ np.asarray(matrix[selected]).T
+        else:
+            buffer = np.empty((min(SCORE_CHUNK_ROWS, n), matrix.shape[1]), dtype=np.float32)
+            for start in range(0, n, SCORE_CHUNK_ROWS):
+                stop = min(start + SCORE_CHUNK_ROWS, n)
+                widened = buffer[:stop - start]
+                np.copyto(widened, matrix[start:stop] if rows is None else matrix[rows[start:stop]])
+                np.matmul(queries, widened.T, out=out[:, start:stop])
+            if snapshot.scales is not None:
+                out *= snapshot.scales if rows is None else snapshot.scales[rows]
+        if rows is None and len(dead_rows):
+            out[:, dead_rows[dead_rows < n]] = -np.inf
+        return out
+
+    def exact_scores(self, query: np.ndarray, rows: np.ndarray, snapshot: Optional[StoreSnapshot] = None) -> np.ndarray:
+        """float32 scores for a few rows, read from the on-disk matrix."""
+        vectors = (snapshot or self.snapshot).vectors
+        order = np.argsort(rows)
+        scores = np.empty(len(rows), dtype=np.float32)
+        # Read in row order so the memory map is walked forwards
+        scores[order] = np.asarray(vectors[rows[order]], dtype=np.float32) @ query
+        return scores
+
+    def add(self, job_ids: Iterable[int], vectors: np.ndarray, model_version: Optional[str] = None):
+        """Insert or overwrite the vectors for the given job ids; overwritten rows are tombstoned.
+
+        Vectors of another model_version than the ones already stored are refused.
+        """
+        job_ids = np.fromiter(job_ids, dtype=np.int64)
+        if len(job_ids) == 0:
+            return
+        vectors = normalize(np.asarray(vectors, dtype=np.float32).reshape(len(job_ids), -1))
+        # If an id is repeated the last vector wins
+        _, last = np.unique(job_ids[::-1], return_index=True)
+        keep = np.sort(len(job_ids) - 1 - last)
+        job_ids, vectors = job_ids[keep], vectors[keep]
+        with self._write_lock():
+            manifest = dict(self._manifest, compact=dict(self._manifest["compact"]))
+            n_old = manifest["rows"]
+            if n_old and vectors.shape[1] != manifest["dim"]:
+                raise ValueError(f"Vectors have {vectors.shape[1]} dimensions, the store holds {manifest['dim']}")
+            if len(self) and model_version != manifest.get("model_version"):
+                raise ValueError(f"Vectors of {model_version} can't join vectors of {manifest.get('model_version')}")
+            overwritten = self.rows_for(job_ids)
+            n_new = n_old + len(job_ids)
+
+            append_rows(self._path("vectors"), vectors, n_old)
+            append_rows(self._path("ids"), job_ids, n_old)
+            if self.quantized:
+                codes, scales = quantize(vectors, self.dtype)
+                self._compact_buffer, compact = extend_rows(self._compact_buffer, n_old, codes)
+                if scales is not None:
+                    self._scales_buffer, scales = extend_rows(self._scales_buffer, n_old, scales)
+                saved = min(manifest["compact"].get(self.dtype, 0), n_old)
+                append_rows(self._path(self.dtype), compact[saved:], saved)
+                if scales is not None:
+                    append_rows(self._path("scales"), scales[saved:], saved)
+                manifest["compact"][self.dtype] = n_new
+            manifest.update(rows=n_new, dim=vectors.shape[1], serial=manifest["serial"] + 1, model_version=model_version)
+            # Committed here; the old rows of overwritten ids lose to the new ones until tombstoned
+            self._write_manifest(manifest)
+            if len(overwritten):
+                self._tombstone(overwritten)
+
+            self.vectors = open_rows(self._path("vectors"), np.float32, n_new, manifest["dim"])
+            row_ids = np.concatenate([self.row_ids, job_ids])
+            row_ids[overwritten] = -1
+            self.row_ids = row_ids
+            if self.quantized:
+                self.compact, self.scales = compact, scales
+            self._compact_if_needed()
+            self._reindex()
+
+    def remove(self, job_ids: Iterable[int]) -> bool:
+        """Tombstone the rows of the given job ids; True if any of them was stored."""
+        with self._write_lock():
+            rows = self.rows_for(job_ids)
+            if len(rows) == 0:
+                return False
+            self._tombstone(rows)
+            # A new serial tells other processes to reload the row ids
+            self._write_manifest(dict(self._manifest, serial=self._manifest["serial"] + 1))
+            row_ids = self.row_ids.copy()
+            row_ids[rows] = -1
+            self.row_ids = row_ids
+            self._compact_if_needed()
+            self._reindex()
+            return True
+
+    def _tombstone(self, rows: np.ndarray):
+        row_ids = open_rows(self._path("ids"), np.int64, self._manifest["rows"], mode="r+")
+        row_ids[np.sort(rows)] = -1
+        row_ids.flush()
+        del row_ids
+
+    def reset(self, model_version: str) -> bool:
+        """Drop every vector so the store can be refilled by model_version; False if another
+        process already did."""
+        with self._write_lock():
+            if self.model_version == model_version:
+                return False
+            self._rewrite(np.empty(0, dtype=np.int64), model_version=model_version)
+            self._reindex()
+            return True
+
+    def _compact_if_needed(self):
+        """Copy the live rows into the next generation once enough rows are dead."""
+        dead = int((self.row_ids < 0).sum())
+        if dead == 0 or dead < COMPACT_DEAD_FRACTION * self.n_rows:
+            return
+        self._rewrite(np.flatnonzero(self.row_ids >= 0))
+
+    def _rewrite(self, live: np.ndarray, **changes):
+        """Copy the given rows into the next generation and drop the current one."""
+        old_generation = self._manifest["generation"]
+        generation = old_generation + 1
+        for path in (self._path(kind, generation) for kind in ("vectors", "ids", "float16", "int8", "scales")):
+            if os.path.exists(path):
+                os.remove(path)
+        for start in range(0, len(live), CHUNK_ROWS):
+            rows = live[start:start + CHUNK_ROWS]
+            append_rows(self._path("vectors", generation), np.asarray(self.vectors[rows]), start)
+        append_rows(self._path("ids", generation), self.row_ids[live], 0)
+        compact = {}
+        if self.quantized:
+            self.compact = self._compact_buffer = self.compact[live]
+            append_rows(self._path(self.dtype, generation), self.compact, 0)
+            if self.scales is not None:
+                self.scales = self._scales_buffer = self.scales[live]
+                append_rows(self._path("scales", generation), self.scales, 0)
+            compact[self.dtype] = len(live)
+        self._write_manifest(dict(self._manifest, generation=generation, rows=len(live),
+                                  serial=self._manifest["serial"] + 1, compact=compact, **changes))
+        self.vectors = open_rows(self._path("vectors"), np.float32, len(live), self._manifest["dim"])
+        self.row_ids = self.row_ids[live]
+        # Processes still mapping the old files keep reading them until they reload
+        for kind in ("vectors", "ids", "float16", "int8", "scales"):
+            try:
+                os.remove(self._path(kind, old_generation))
+            except FileNotFoundError:
+                pass
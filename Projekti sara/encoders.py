@@ -0,0 +1,87 @@
+"""Sentence encoder backends for job and profile embeddings.
+
+ENCODER_BACKEND selects how the MiniLM model runs:
+
+    torch        eager PyTorch SentenceTransformer (the reference)
+    torch-qint8  PyTorch with the Linear layers dynamically quantized to int8
+    onnx         ONNX Runtime through sentence-transformers >= 3.2 with
+                 optimum[onnxruntime]; exported on first load unless the model
+                 repo ships one (ENCODER_ONNX_FILE picks e.g. a quantized file)
+
+Every backend returns float32 arrays shaped like SentenceTransformer.encode.
+Check a backend against the reference before switching with:
+
+    python -m benchmarks.encoders --backends torch-qint8 onnx
+"""
+import os
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from embedding_service import EMBEDDING_MODEL_NAME
+from embedding_store import normalize
+
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch")
+# Path inside the model repo, e.g. "onnx/model_qint8_avx2.onnx"; unset uses onnx/model.onnx
+ENCODER_ONNX_FILE = os.getenv("ENCODER_ONNX_FILE")
+
+
+class Encoder:
+    """A loaded model plus the version string its embeddings are tied to."""
+
+    def __init__(self, backend: str, model, model_version: Optional[str] = None):
+        self.backend = backend
+        self.model = model
+        self.model_version = model_version or backend_version(backend)
+
+    def encode(self, texts: Union[str, List[str]], **kwargs) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, **kwargs), dtype=np.float32)
+
+
+def _load_torch():
+    # Imported here: pulling in torch costs seconds we don't want at import time
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+def _load_torch_qint8():
+    import torch
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME, device="cpu")
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_onnx():
+    from sentence_transformers import SentenceTransformer
+    model_kwargs = {"file_name": ENCODER_ONNX_FILE} if ENCODER_ONNX_FILE else None
+    return SentenceTransformer(EMBEDDING_MODEL_NAME, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+
+ENCODER_BACKENDS: Dict[str, Callable] = {
+    "torch": _load_torch,
+    "torch-qint8": _load_torch_qint8,
+    "onnx": _load_onnx,
+}
+
+
+def backend_version(backend: str = ENCODER_BACKEND) -> str:
+    """Version string for embeddings produced by a backend; different backends never share cached vectors."""
+    if backend == "onnx" and ENCODER_ONNX_FILE:
+        return f"{EMBEDDING_MODEL_NAME}:onnx:{ENCODER_ONNX_FILE}"
+    return f"{EMBEDDING_MODEL_NAME}:{backend}"
+
+
+def load_encoder(backend: str = ENCODER_BACKEND) -> Encoder:
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {backend}")
+    return Encoder(backend, ENCODER_BACKENDS[backend]())
+
+
+def parity(candidate: Encoder, reference: Encoder, texts: List[str]) -> Dict[str, float]:
+    """Cosine agreement between two encoders on the same texts."""
+    cosines = np.sum(normalize(candidate.encode(texts)) * normalize(reference.encode(texts)), axis=1)
+    return {
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+        "p01_cosine": float(np.percentile(cosines, 1)),
+    }
@@ -0,0 +1,203 @@
+"""Bulk import of existing CV files for one user account.
+
+    python import_cvs.py /data/partner_cvs --user-id 42 --workers 4 --batch-size 256
+    python import_cvs.py partner_cvs.zip --user-id 42
+
+The source is a directory (walked recursively) or a .zip/.tar(.gz) archive;
+PDF, DOCX and TXT files are imported, anything else is ignored. Files are
+copied to the same content-addressed storage as uploads, and a file whose
+hash the user already has a CV for (from an earlier upload or run) is
+skipped, as are duplicates within the source. The rest is looked up in the
+parse cache and otherwise parsed across a process pool (text extraction
+plus nlp.pipe, as parse_cv does), and each batch of CV rows is inserted in
+one transaction. Files that fail are reported at the end and not inserted,
+so running the import again retries them.
+"""
+import argparse
+import os
+import tarfile
+import time
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple
+
+from cv_nlp import parse_text, parse_texts
+from cv_storage import store_parsed
+from cv_upload import CV_EXTENSIONS, parser_version, store_file
+from database import SessionLocal
+from document_extraction import extract_text
+from models import CV, CV_DONE, User
+from parse_cache import parse_cache
+
+
+def iter_sources(path: str) -> Iterator[Tuple[str, Callable[[], BinaryIO]]]:
+    """(name, opener) for each supported file; the opener returns a binary file object."""
+    def supported(name: str) -> bool:
+        return name.lower().endswith(CV_EXTENSIONS) and not os.path.basename(name).startswith(".")
+
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                if supported(name):
+                    yield file_path, lambda file_path=file_path: open(file_path, "rb")
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and supported(info.filename):
+                    yield info.filename, lambda info=info: archive.open(info)
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path) as archive:
+            # Members are read in archive order, so compressed tars are streamed once
+            for member in archive:
+                if member.isfile() and supported(member.name):
+                    yield member.name, lambda member=member: archive.extractfile(member)
+    else:
+        raise SystemExit(f"{path} is not a directory or a zip/tar archive")
+
+
+def _parse_batch(files: List[Tuple[str, str]]) -> List[Tuple[Optional[dict], Optional[str]]]:
+    """(parsed_data, error) for each (file_path, file_type), parsed in a worker process."""
+    texts, results = [], []
+    for file_path, file_type in files:
+        try:
+            texts.append(extract_text(file_path, file_type))
+            results.append((None, None))
+        except Exception as e:
+            texts.append(None)
+            results.append((None, f"Text extraction failed: {str(e)}"))
+    ok = [i for i, text in enumerate(texts) if text is not None]
+    try:
+        parsed = parse_texts([texts[i] for i in ok])
+    except Exception:
+        # Find the document that broke the batch and parse the others one by one
+        parsed = []
+        for i in ok:
+            try:
+                parsed.append(parse_text(texts[i]))
+            except Exception as e:
+                parsed.append(None)
+                results[i] = (None, f"Parsing failed: {str(e)}")
+    for i, parsed_data in zip(ok, parsed):
+        if parsed_data is not None:
+            results[i] = (parsed_data, None)
+    return results
+
+
+def store_source(name: str, opener: Callable[[], BinaryIO]) -> Tuple[str, str, str, str]:
+    """Copy one source file into upload storage; returns (name, file_type, file_path, content_hash)."""
+    extension = os.path.splitext(name)[1].lower()
+    with closing(opener()) as source:
+        file_path, content_hash = store_file(source, extension)
+    return name, extension[1:], file_path, content_hash
+
+
+def import_batch(db, pool: ProcessPoolExecutor, user_id: int, batch: List[Tuple[str, str, str, str]], seen: set,
+                 version: str, workers: int, counts: Counter, failures: List[Tuple[str, str]]):
+    stored = []
+    for entry in batch:
+        if entry[3] in seen:
+            counts["duplicate"] += 1
+            continue
+        seen.add(entry[3])
+        stored.append(entry)
+
+    hashes = [content_hash for _, _, _, content_hash in stored]
+    imported = {content_hash for (content_hash,) in db.query(CV.content_hash)
+                .filter(CV.user_id == user_id, CV.content_hash.in_(hashes))} if hashes else set()
+    stored = [entry for entry in stored if entry[3] not in imported]
+    counts["already imported"] += len(imported)
+
+    parsed = parse_cache.get_many(db, [content_hash for _, _, _, content_hash in stored], version)
+    counts["parse cache hit"] += len(parsed)
+    to_parse = [entry for entry in stored if entry[3] not in parsed]
+    step = max(1, -(-len(to_parse) // workers))
+    chunks = [to_parse[start:start + step] for start in range(0, len(to_parse), step)]
+    futures = [pool.submit(_parse_batch, [(file_path, file_type) for _, file_type, file_path, _ in chunk])
+               for chunk in chunks]
+    fresh = {}
+    for chunk, future in zip(chunks, futures):
+        for (name, _, _, content_hash), (parsed_data, error) in zip(chunk, future.result()):
+            if parsed_data is None:
+                failures.append((name, error))
+            else:
+                fresh[content_hash] = parsed_data
+    parsed.update(fresh)
+
+    for name, file_type, file_path, content_hash in stored:
+        if content_hash not in parsed:
+            continue
+        cv = CV(
+            user_id=user_id,
+            filename=os.path.basename(name)[:255],
+            file_type=file_type,
+            file_path=file_path,
+            content_hash=content_hash,
+            status=CV_DONE,
+        )
+        store_parsed(cv, parsed[content_hash])
+        db.add(cv)
+        counts["imported"] += 1
+    db.commit()
+    parse_cache.put_many(db, version, fresh)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a directory or archive of CV files for one user.")
+    parser.add_argument("source", help="directory, .zip or .tar(.gz) archive")
+    parser.add_argument("--user-id", type=int, required=True, help="account the CVs are imported into")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=256, help="files per transaction")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if db.get(User, args.user_id) is None:
+            raise SystemExit(f"User {args.user_id} does not exist")
+        version = parser_version()
+        counts: Counter = Counter()
+        failures: List[Tuple[str, str]] = []
+        seen: set = set()
+        files = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            batch = []
+            # Files are copied to storage while the source (possibly an archive) is open
+            for name, opener in iter_sources(args.source):
+                files += 1
+                try:
+                    batch.append(store_source(name, opener))
+                except Exception as e:
+                    failures.append((name, str(e)))
+                if len(batch) < args.batch_size:
+                    continue
+                import_batch(db, pool, args.user_id, batch, seen, version, args.workers, counts, failures)
+                batch = []
+                elapsed = time.perf_counter() - started
+                print(f"files {files}  imported {counts['imported']}  failed {len(failures)}  "
+                      f"{files / elapsed:.1f} files/s  {elapsed:.1f}s")
+            if batch:
+                import_batch(db, pool, args.user_id, batch, seen, version, args.workers, counts, failures)
+
+        elapsed = time.perf_counter() - started
+        print(f"Done: {files} files in {elapsed:.1f}s ({files / max(elapsed, 1e-9):.1f} files/s)")
+        for label in ("imported", "parse cache hit", "already imported", "duplicate"):
+            print(f"  {label:<17}{counts[label]}")
+        print(f"  {'failed':<17}{len(failures)}")
+        if failures:
+            reasons = Counter(error.split(":")[0] for _, error in failures)
+            for reason, count in reasons.most_common():
+                print(f"    {count:>6}  {reason}")
+            for name, error in failures[:20]:
+                print(f"    {name}: {error}")
+            if len(failures) > 20:
+                print(f"    ... and {len(failures) - 20} more")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
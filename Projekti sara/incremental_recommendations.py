@@ -0,0 +1,127 @@
+import heapq
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from embedding_store import normalize
+
+# Jobs kept per user; a few more than the served top_k so removals don't force a rescore
+INCREMENTAL_HEAP_SIZE = int(os.getenv("INCREMENTAL_HEAP_SIZE", "20"))
+INCREMENTAL_MAX_USERS = int(os.getenv("INCREMENTAL_MAX_USERS", "100000"))
+
+
+class _UserHeap:
+    __slots__ = ("key", "vector", "heap", "members", "cutoff")
+
+    def __init__(self, key: Hashable, vector: np.ndarray):
+        self.key = key
+        self.vector = vector
+        self.heap: List[Tuple[float, int]] = []
+        self.members = set()
+        # Upper bound on the score of every job outside the heap
+        self.cutoff = -np.inf
+
+
+class RecommendationHeaps:
+    """Bounded per-user min-heaps of (score, job_id) maintained incrementally.
+
+    A heap seeded from a full ranking holds the user's true top-N jobs. New jobs
+    are scored only against the cached user vectors and merged in, so ingestion
+    costs O(users x new jobs) instead of a catalog rescore. Removing a job only
+    shrinks a heap (everything outside it scored lower), so a heap keeps serving
+    until fewer than top_k entries remain, and is then re-seeded. A new job is
+    only admitted above the best score left outside the heap (the N-th best at
+    seed time, raised by every entry pushed out since), or it could jump jobs
+    that were never tracked.
+    """
+
+    def __init__(self, heap_size: int = INCREMENTAL_HEAP_SIZE, max_users: int = INCREMENTAL_MAX_USERS):
+        self.heap_size = heap_size
+        self.max_users = max_users
+        self._users: "OrderedDict[int, _UserHeap]" = OrderedDict()
+        self._matrix = None
+        self._matrix_users: List[int] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def seed(self, user_id: int, key: Hashable, vector: np.ndarray, ranked: Iterable[Tuple[int, float]]):
+        """Start tracking a user from a full ranking (best first, at least heap_size long if possible)."""
+        entry = _UserHeap(key, normalize(vector))
+        for job_id, score in ranked:
+            self._push(entry, float(score), int(job_id))
+        if len(entry.heap) >= self.heap_size:
+            # A shorter ranking covered the whole catalog: nothing is left outside
+            entry.cutoff = entry.heap[0][0]
+        with self._lock:
+            self._users[user_id] = entry
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+            self._matrix = None
+
+    def get(self, user_id: int, key: Hashable, top_k: int) -> Optional[List[Tuple[int, float]]]:
+        """The user's ranking, best first, or None (re-seed it) if it isn't tracked for this profile or ran short."""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or entry.key != key or len(entry.heap) < top_k:
+                return None
+            self._users.move_to_end(user_id)
+            return [(job_id, score) for score, job_id in sorted(entry.heap, reverse=True)]
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self._matrix = None
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            if self._users.pop(user_id, None) is not None:
+                self._matrix = None
+
+    def _push(self, entry: _UserHeap, score: float, job_id: int):
+        if job_id in entry.members:
+            return
+        if len(entry.heap) < self.heap_size:
+            heapq.heappush(entry.heap, (score, job_id))
+            entry.members.add(job_id)
+        elif score > entry.heap[0][0]:
+            dropped_score, dropped = heapq.heappushpop(entry.heap, (score, job_id))
+            entry.members.discard(dropped)
+            entry.members.add(job_id)
+            entry.cutoff = max(entry.cutoff, dropped_score)
+
+    def add_jobs(self, job_ids: Iterable[int], vectors: np.ndarray):
+        """Merge newly stored jobs into every tracked user's heap."""
+        job_ids = [int(job_id) for job_id in job_ids]
+        if not job_ids:
+            return
+        with self._lock:
+            if not self._users:
+                return
+            if self._matrix is None:
+                self._matrix_users = list(self._users)
+                self._matrix = np.stack([self._users[user_id].vector for user_id in self._matrix_users])
+            scores = self._matrix @ normalize(np.asarray(vectors).reshape(len(job_ids), -1)).T
+            for row, user_id in enumerate(self._matrix_users):
+                entry = self._users.get(user_id)
+                if entry is None:
+                    continue
+                for j in np.nonzero(scores[row] > entry.cutoff)[0]:
+                    self._push(entry, float(scores[row, j]), job_ids[j])
+
+    def remove_jobs(self, job_ids: Iterable[int]):
+        job_ids = set(int(job_id) for job_id in job_ids)
+        with self._lock:
+            for entry in self._users.values():
+                if entry.members & job_ids:
+                    entry.heap = [(score, job_id) for score, job_id in entry.heap if job_id not in job_ids]
+                    heapq.heapify(entry.heap)
+                    entry.members -= job_ids
+
+
+recommendation_heaps = RecommendationHeaps()
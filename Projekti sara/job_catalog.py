@@ -0,0 +1,161 @@
+import datetime
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models import Job
+
+CATALOG_COLUMNS = (Job.id, Job.title, Job.location_name, Job.minimum_salary, Job.maximum_salary, Job.expiration_date)
+
+
+class JobSummary:
+    __slots__ = ("id", "title", "location_name", "minimum_salary", "maximum_salary", "expiration_date")
+
+    def __init__(self, id: int, title: str, location_name: Optional[str], minimum_salary: Optional[float],
+                 maximum_salary: Optional[float], expiration_date: Optional[datetime.datetime]):
+        self.id = id
+        self.title = title
+        self.location_name = location_name
+        self.minimum_salary = minimum_salary
+        self.maximum_salary = maximum_salary
+        self.expiration_date = expiration_date
+
+
+class JobCatalog:
+    """Columnar read-side copy of the small job fields used to build recommendation responses.
+
+    One array per column (locations dictionary-encoded, missing salaries as
+    NaN, missing expiry as NaT) instead of ORM objects; descriptions are not
+    kept and are fetched for the returned jobs only.
+    """
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.titles = np.empty(0, dtype=object)
+        self.location_codes = np.empty(0, dtype=np.int32)
+        self.minimum_salary = np.empty(0, dtype=np.float32)
+        self.maximum_salary = np.empty(0, dtype=np.float32)
+        self.expiration_date = np.empty(0, dtype="datetime64[s]")
+        # Code -1 is "no location"
+        self.locations: List[str] = []
+        self._location_codes: Dict[str, int] = {}
+        self._sorted_ids = np.empty(0, dtype=np.int64)
+        self._sorted_rows = np.empty(0, dtype=np.int64)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _reindex(self):
+        self._sorted_rows = np.argsort(self.ids, kind="stable")
+        self._sorted_ids = self.ids[self._sorted_rows]
+
+    def _rows(self, job_ids: np.ndarray):
+        """Rows of the given ids plus a mask of which ids are present."""
+        if len(self._sorted_ids) == 0:
+            return np.zeros(len(job_ids), dtype=np.int64), np.zeros(len(job_ids), dtype=bool)
+        positions = np.searchsorted(self._sorted_ids, job_ids)
+        positions[positions == len(self._sorted_ids)] = 0
+        return self._sorted_rows[positions], self._sorted_ids[positions] == job_ids
+
+    def _location_code(self, name: Optional[str]) -> int:
+        if name is None:
+            return -1
+        code = self._location_codes.get(name)
+        if code is None:
+            code = self._location_codes[name] = len(self.locations)
+            self.locations.append(name)
+        return code
+
+    def upsert(self, rows: Iterable) -> bool:
+        """Add or replace jobs from Job objects or (id, title, location_name, minimum_salary,
+        maximum_salary, expiration_date) rows; True if any job was new or differed."""
+        rows = [(row.id, row.title, row.location_name, row.minimum_salary, row.maximum_salary, row.expiration_date)
+                if isinstance(row, Job) else tuple(row) for row in rows]
+        if not rows:
+            return False
+        # If an id is repeated the last row wins
+        rows = list({row[0]: row for row in rows}.values())
+        with self._lock:
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            titles = np.empty(len(rows), dtype=object)
+            titles[:] = [row[1] for row in rows]
+            codes = np.array([self._location_code(row[2]) for row in rows], dtype=np.int32)
+            minimum = np.array([np.nan if row[3] is None else row[3] for row in rows], dtype=np.float32)
+            maximum = np.array([np.nan if row[4] is None else row[4] for row in rows], dtype=np.float32)
+            expiry = np.array([np.datetime64("NaT") if row[5] is None else np.datetime64(row[5], "s") for row in rows],
+                              dtype="datetime64[s]")
+
+            existing, found = self._rows(ids)
+            existing = existing[found]
+            new = ~found
+            if not new.any() and np.array_equal(self.titles[existing], titles[found]) \
+                    and np.array_equal(self.location_codes[existing], codes[found]) \
+                    and np.array_equal(self.minimum_salary[existing], minimum[found], equal_nan=True) \
+                    and np.array_equal(self.maximum_salary[existing], maximum[found], equal_nan=True) \
+                    and np.array_equal(self.expiration_date[existing], expiry[found], equal_nan=True):
+                return False
+            self.titles[existing] = titles[found]
+            self.location_codes[existing] = codes[found]
+            self.minimum_salary[existing] = minimum[found]
+            self.maximum_salary[existing] = maximum[found]
+            self.expiration_date[existing] = expiry[found]
+            self.ids = np.concatenate([self.ids, ids[new]])
+            self.titles = np.concatenate([self.titles, titles[new]])
+            self.location_codes = np.concatenate([self.location_codes, codes[new]])
+            self.minimum_salary = np.concatenate([self.minimum_salary, minimum[new]])
+            self.maximum_salary = np.concatenate([self.maximum_salary, maximum[new]])
+            self.expiration_date = np.concatenate([self.expiration_date, expiry[new]])
+            self._reindex()
+            return True
+
+    def remove(self, job_ids: Iterable[int]) -> bool:
+        """Drop the given jobs; True if any of them was held."""
+        with self._lock:
+            rows, found = self._rows(np.fromiter(job_ids, dtype=np.int64))
+            if not found.any():
+                return False
+            keep = np.ones(len(self.ids), dtype=bool)
+            keep[rows[found]] = False
+            self.ids = self.ids[keep]
+            self.titles = self.titles[keep]
+            self.location_codes = self.location_codes[keep]
+            self.minimum_salary = self.minimum_salary[keep]
+            self.maximum_salary = self.maximum_salary[keep]
+            self.expiration_date = self.expiration_date[keep]
+            self._reindex()
+            return True
+
+    def sync(self, db: Session, job_ids: np.ndarray, chunk_size: int = 1000):
+        """Load the jobs in job_ids the catalog doesn't hold yet and drop the ones no longer listed."""
+        self.remove(np.setdiff1d(self.ids, job_ids).tolist())
+        missing = np.setdiff1d(job_ids, self.ids).tolist()
+        for start in range(0, len(missing), chunk_size):
+            self.upsert(db.query(*CATALOG_COLUMNS).filter(Job.id.in_(missing[start:start + chunk_size])))
+
+    def get(self, job_ids: Iterable[int]) -> Dict[int, JobSummary]:
+        """Summaries of the given jobs keyed by id; unknown ids are left out."""
+        with self._lock:
+            job_ids = np.fromiter(job_ids, dtype=np.int64)
+            rows, found = self._rows(job_ids)
+            summaries = {}
+            for row in rows[found]:
+                code = int(self.location_codes[row])
+                minimum, maximum, expiry = self.minimum_salary[row], self.maximum_salary[row], self.expiration_date[row]
+                summaries[int(self.ids[row])] = JobSummary(
+                    int(self.ids[row]),
+                    self.titles[row],
+                    self.locations[code] if code >= 0 else None,
+                    None if np.isnan(minimum) else float(minimum),
+                    None if np.isnan(maximum) else float(maximum),
+                    None if np.isnat(expiry) else expiry.astype(datetime.datetime),
+                )
+            return summaries
+
+
+def fetch_descriptions(db: Session, job_ids: List[int]) -> Dict[int, str]:
+    if not job_ids:
+        return {}
+    return dict(db.query(Job.id, Job.description).filter(Job.id.in_(job_ids)).all())
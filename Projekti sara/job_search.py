@@ -1,15 +1,20 @@
 import requests
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 from models import Job, User
-from database import get_db
+from database import get_db, SessionLocal
 from sqlalchemy.orm import Session
 from auth import get_current_user
 import os
 import logging
 
+try:
+    from recommendation_engine import recommender
+except ImportError:
+    recommender = None
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -71,6 +76,31 @@ def store_job_in_db(job_data: JobSearchResult, db: Session) -> Job:
     db.refresh(new_job)
     return new_job
 
+def index_stored_jobs(job_ids: List[int], force: bool = False):
+    """Precompute embeddings for freshly stored jobs so recommendations never re-encode them.
+
+    Meant to run as a background task (in the threadpool, after the response), so it
+    uses its own session; a failure is only logged, the periodic store sync retries it.
+    """
+    if recommender is None or not job_ids:
+        return
+    db = SessionLocal()
+    try:
+        recommender.index_jobs(db.query(Job).filter(Job.id.in_(job_ids)).all(), force=force)
+    except Exception as e:
+        logger.error(f"Error indexing jobs: {str(e)}")
+    finally:
+        db.close()
+
+def remove_indexed_jobs(job_ids: List[int]):
+    """Background counterpart of index_stored_jobs for deleted jobs"""
+    if recommender is None or not job_ids:
+        return
+    try:
+        recommender.remove_jobs(job_ids)
+    except Exception as e:
+        logger.error(f"Error removing jobs from the index: {str(e)}")
+
 def parse_date(date_str):
     if not date_str:
         return None
@@ -86,6 +116,7 @@ def parse_date(date_str):
 
 @router.get("/search", response_model=List[JobSearchResult])
 async def search_jobs(
+    background_tasks: BackgroundTasks,
     keywords: Optional[str] = None,
     location: Optional[str] = None,
     distance_from_location: Optional[int] = None,
@@ -154,6 +185,7 @@ async def search_jobs(
         
         # Convert the response to our JobSearchResult model and store in database
         jobs = []
+        stored_jobs = []
         for job in jobs_data:
             try:
                 job_result = JobSearchResult(
@@ -176,7 +208,7 @@ async def search_jobs(
                 )
                 
                 # Store the job in our database
-                store_job_in_db(job_result, db)
+                stored_jobs.append(store_job_in_db(job_result, db))
                 jobs.append(job_result)
                 
             except Exception as e:
@@ -184,6 +216,7 @@ async def search_jobs(
                 logger.error(f"Job data: {job}")
                 continue
         
+        background_tasks.add_task(index_stored_jobs, [stored.id for stored in stored_jobs])
         return jobs
         
     except requests.exceptions.RequestException as e:
@@ -202,6 +235,7 @@ async def search_jobs(
 @router.get("/job/{job_id}", response_model=JobSearchResult)
 async def get_job_details(
     job_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -260,7 +294,7 @@ async def get_job_details(
         )
         
         # Store the job in our database
-        store_job_in_db(job, db)
+        background_tasks.add_task(index_stored_jobs, [store_job_in_db(job, db).id])
         
         return job
         
@@ -1,18 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import datetime
 from sqlalchemy import desc
 from pydantic import BaseModel
 
-from database import get_db
+from database import get_db, SessionLocal
 from models import Job, User, Recommendation
 from auth import get_current_user
 from schemas import JobSchema, RecommendationSchema
+from inference_executor import inference_executor
+from job_search import index_stored_jobs, remove_indexed_jobs
 
 # If you have recommendation_engine.py, import recommender
 try:
-    from recommendation_engine import recommender
+    from recommendation_engine import recommender, RecommendationFilters
 except ImportError:
     recommender = None
 
@@ -31,6 +33,7 @@ class JobCreate(BaseModel):
 @router.post("/", response_model=JobSchema, status_code=status.HTTP_201_CREATED)
 async def create_job(
     job: JobCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -47,6 +50,8 @@ async def create_job(
     db.add(new_job)
     db.commit()
     db.refresh(new_job)
+    # Encoding runs after the response, off the event loop
+    background_tasks.add_task(index_stored_jobs, [new_job.id])
     return new_job
 
 # Get all job postings
@@ -77,6 +82,7 @@ async def get_job(
 @router.put("/{job_id}", response_model=JobSchema)
 async def update_job(
     job_id: int,
+    background_tasks: BackgroundTasks,
     title: str = None,
     description: str = None,
     db: Session = Depends(get_db),
@@ -99,12 +105,15 @@ async def update_job(
         job.description = description
     db.commit()
     db.refresh(job)
+    if title or description:
+        background_tasks.add_task(index_stored_jobs, [job.id], force=True)
     return job
 
 # Delete a job posting (Admin only)
 @router.delete("/{job_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_job(
     job_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -121,17 +130,42 @@ async def delete_job(
         )
     db.delete(job)
     db.commit()
+    background_tasks.add_task(remove_indexed_jobs, [job_id])
     return None
 
+def recommend_for_user(user_id: int, filters: "RecommendationFilters" = None) -> List[dict]:
+    """Runs on an inference thread, so it uses its own session instead of the request's"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            return []
+        return recommender.get_recommendations(user, db, filters=filters)
+    finally:
+        db.close()
+
 # Get job recommendations for the current user
 @router.get("/recommendations/", response_model=List[dict])
 async def get_job_recommendations(
-    db: Session = Depends(get_db),
+    location_name: Optional[str] = None,
+    min_salary: Optional[float] = None,
+    max_salary: Optional[float] = None,
+    job_type: Optional[str] = None,
+    exclude_expired: bool = True,
+    created_after: Optional[datetime.datetime] = None,
     current_user: User = Depends(get_current_user)
 ):
     if recommender is None:
         raise HTTPException(status_code=500, detail="Recommendation engine not available.")
-    recommendations = recommender.get_recommendations(current_user, db)
+    filters = RecommendationFilters(
+        location_name=location_name,
+        min_salary=min_salary,
+        max_salary=max_salary,
+        job_type=job_type,
+        exclude_expired=exclude_expired,
+        created_after=created_after
+    )
+    recommendations = await inference_executor.run(recommend_for_user, current_user.id, filters)
     if not recommendations:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,249 @@
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from embedding_store import EMBEDDINGS_DIR, top_k_indices
+
+# Persisted merged segment; recent additions are re-added from the jobs table on startup
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", os.path.join(EMBEDDINGS_DIR, "lexical_index.npz"))
+# Postings buffered before they are merged into the array segment (at least 10% of its size,
+# so bulk loads merge a logarithmic number of times)
+LEXICAL_MERGE_THRESHOLD = int(os.getenv("LEXICAL_MERGE_THRESHOLD", "200000"))
+
+logger = logging.getLogger(__name__)
+
+# Keeps skill spellings such as c++, c#, node.js and ci/cd in one token
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our that the their this to was we
+were will with you your job role work working team skills experience education
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+def job_terms(title: str, description: str) -> Counter:
+    # Title terms count twice: they describe the role better than boilerplate in the body
+    terms = Counter(tokenize(description))
+    for token in tokenize(title):
+        terms[token] += 2
+    return terms
+
+
+class LexicalIndex:
+    """BM25 inverted index over job titles and descriptions.
+
+    Postings live in one array segment sorted by term (offsets/slots/tfs, CSR
+    style) plus a small dict-of-lists buffer for recent additions. Removed
+    jobs are only masked out; both the buffer and the dead slots are folded
+    into a fresh segment by merge(), which also recomputes document
+    frequencies, so idf counts removed jobs until the next merge.
+    """
+
+    def __init__(self, path: Optional[str] = LEXICAL_INDEX_PATH, k1: float = 1.2, b: float = 0.75,
+                 merge_threshold: int = LEXICAL_MERGE_THRESHOLD):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.merge_threshold = merge_threshold
+        self.vocab: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._slots = np.empty(0, dtype=np.int32)
+        self._tfs = np.empty(0, dtype=np.float32)
+        self._buffer: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        self._buffered = 0
+        self._df = np.zeros(0, dtype=np.int64)
+        # Per slot
+        self.job_ids = np.empty(0, dtype=np.int64)
+        self._lengths = np.empty(0, dtype=np.float32)
+        self._alive = np.empty(0, dtype=bool)
+        self._n_slots = 0
+        self._slot_of: Dict[int, int] = {}
+        self._total_length = 0.0
+        self._lock = threading.RLock()
+        if path and os.path.exists(path):
+            try:
+                self.load()
+            except Exception as e:
+                logger.error(f"Could not load lexical index, rebuilding from the jobs table: {str(e)}")
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, job_id: int) -> bool:
+        return int(job_id) in self._slot_of
+
+    def ids(self) -> np.ndarray:
+        with self._lock:
+            return np.fromiter(self._slot_of, dtype=np.int64, count=len(self._slot_of))
+
+    def _term_id(self, term: str) -> int:
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            term_id = self.vocab[term] = len(self.vocab)
+            if term_id >= len(self._df):
+                self._df = np.concatenate([self._df, np.zeros(max(1024, len(self._df)), dtype=np.int64)])
+        return term_id
+
+    def _new_slot(self, job_id: int, length: int) -> int:
+        if self._n_slots == len(self.job_ids):
+            grow = max(1024, len(self.job_ids))
+            self.job_ids = np.concatenate([self.job_ids, np.zeros(grow, dtype=np.int64)])
+            self._lengths = np.concatenate([self._lengths, np.zeros(grow, dtype=np.float32)])
+            self._alive = np.concatenate([self._alive, np.zeros(grow, dtype=bool)])
+        slot = self._n_slots
+        self._n_slots += 1
+        self.job_ids[slot] = job_id
+        self._lengths[slot] = length
+        self._alive[slot] = True
+        self._slot_of[job_id] = slot
+        self._total_length += length
+        return slot
+
+    def add(self, docs: Iterable[Tuple[int, str, str]]):
+        """Index (job_id, title, description) triples, replacing earlier versions of the same jobs."""
+        with self._lock:
+            for job_id, title, description in docs:
+                job_id = int(job_id)
+                self._discard(job_id)
+                terms = job_terms(title, description)
+                slot = self._new_slot(job_id, sum(terms.values()))
+                for term, tf in terms.items():
+                    term_id = self._term_id(term)
+                    self._buffer[term_id].append((slot, tf))
+                    self._df[term_id] += 1
+                self._buffered += len(terms)
+            if self._buffered >= max(self.merge_threshold, len(self._slots) // 10):
+                self.merge()
+                self.save()
+
+    def _discard(self, job_id: int):
+        slot = self._slot_of.pop(job_id, None)
+        if slot is not None:
+            self._alive[slot] = False
+            self._total_length -= float(self._lengths[slot])
+
+    def remove(self, job_ids: Iterable[int]):
+        with self._lock:
+            for job_id in job_ids:
+                self._discard(int(job_id))
+            if self._n_slots > 1024 and len(self._slot_of) < self._n_slots * 0.75:
+                self.merge()
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        slots, tfs = np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        if term_id + 1 < len(self._offsets):
+            start, stop = self._offsets[term_id], self._offsets[term_id + 1]
+            slots, tfs = self._slots[start:stop], self._tfs[start:stop]
+        buffered = self._buffer.get(term_id)
+        if buffered:
+            extra = np.array(buffered, dtype=np.int64)
+            slots = np.concatenate([slots, extra[:, 0].astype(np.int32)])
+            tfs = np.concatenate([tfs, extra[:, 1].astype(np.float32)])
+        return slots, tfs
+
+    def merge(self):
+        """Fold the buffer into the array segment and drop removed jobs."""
+        with self._lock:
+            terms = [np.repeat(np.arange(len(self._offsets) - 1), np.diff(self._offsets))]
+            slots, tfs = [self._slots], [self._tfs]
+            for term_id, postings in self._buffer.items():
+                postings = np.array(postings, dtype=np.int64)
+                terms.append(np.full(len(postings), term_id))
+                slots.append(postings[:, 0])
+                tfs.append(postings[:, 1])
+            terms = np.concatenate(terms).astype(np.int64)
+            slots = np.concatenate(slots).astype(np.int64)
+            tfs = np.concatenate(tfs).astype(np.float32)
+
+            alive = self._alive[:self._n_slots]
+            keep = alive[slots]
+            new_slot = np.cumsum(alive) - 1
+            terms, slots, tfs = terms[keep], new_slot[slots[keep]], tfs[keep]
+            order = np.argsort(terms, kind="stable")
+            terms, slots, tfs = terms[order], slots[order], tfs[order]
+
+            self._offsets = np.concatenate([[0], np.cumsum(np.bincount(terms, minlength=len(self.vocab)))]).astype(np.int64)
+            self._slots = slots.astype(np.int32)
+            self._tfs = tfs
+            self._df = np.diff(self._offsets)
+            self.job_ids = self.job_ids[:self._n_slots][alive]
+            self._lengths = self._lengths[:self._n_slots][alive]
+            self._alive = np.ones(len(self.job_ids), dtype=bool)
+            self._n_slots = len(self.job_ids)
+            self._slot_of = {int(job_id): slot for slot, job_id in enumerate(self.job_ids)}
+            self._total_length = float(self._lengths.sum())
+            self._buffer = defaultdict(list)
+            self._buffered = 0
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            if self._buffered or self._n_slots != len(self._slot_of):
+                self.merge()
+            tmp_path = self.path + ".tmp.npz"
+            vocab = np.array(sorted(self.vocab, key=self.vocab.get), dtype=object)
+            with open(tmp_path, "wb") as f:
+                np.savez(f, vocab=vocab.astype(str), offsets=self._offsets, slots=self._slots, tfs=self._tfs,
+                         job_ids=self.job_ids, lengths=self._lengths)
+            os.replace(tmp_path, self.path)
+
+    def load(self):
+        with self._lock, np.load(self.path) as data:
+            self.vocab = {str(term): term_id for term_id, term in enumerate(data["vocab"])}
+            self._offsets = data["offsets"]
+            self._slots = data["slots"]
+            self._tfs = data["tfs"]
+            self._df = np.diff(self._offsets)
+            self.job_ids = data["job_ids"]
+            self._lengths = data["lengths"]
+            self._alive = np.ones(len(self.job_ids), dtype=bool)
+            self._n_slots = len(self.job_ids)
+            self._slot_of = {int(job_id): slot for slot, job_id in enumerate(self.job_ids)}
+            self._total_length = float(self._lengths.sum())
+            self._buffer = defaultdict(list)
+            self._buffered = 0
+
+    def search(self, query: Dict[str, float], k: int) -> List[Tuple[int, float]]:
+        """Top-k (job_id, BM25 score) for weighted query terms; only jobs matching a term are returned."""
+        with self._lock:
+            if not self._slot_of:
+                return []
+            n_docs = self._n_slots
+            average_length = max(self._total_length / len(self._slot_of), 1.0)
+            scores = np.zeros(n_docs, dtype=np.float32)
+            for term, weight in query.items():
+                term_id = self.vocab.get(term)
+                if term_id is None:
+                    continue
+                slots, tfs = self._postings(term_id)
+                if len(slots) == 0:
+                    continue
+                df = float(self._df[term_id])
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[slots] / average_length)
+                scores[slots] += weight * idf * tfs * (self.k1 + 1) / (tfs + norm)
+            scores[~self._alive[:n_docs]] = 0
+            best = top_k_indices(scores, k)[0]
+            return [(int(self.job_ids[slot]), float(scores[slot])) for slot in best if scores[slot] > 0]
+
+
+def profile_query(cv_data: dict, skill_weight: float = 2.0) -> Dict[str, float]:
+    """Weighted BM25 query terms from a parsed CV; explicit skills outweigh free text."""
+    query: Dict[str, float] = {}
+    for field in ("experience", "education"):
+        for token, count in Counter(tokenize(" ".join(cv_data.get(field) or []))).items():
+            query[token] = query.get(token, 0.0) + min(count, 3)
+    for skill in cv_data.get("skills") or []:
+        for token in tokenize(skill):
+            query[token] = query.get(token, 0.0) + skill_weight
+    return query
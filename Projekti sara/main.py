@@ -1,15 +1,42 @@
+from contextlib import asynccontextmanager
+import os
+import threading
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from auth import router as auth_router
 from cv_upload import router as cv_router
 from jobs import router as jobs_router
 from job_search import router as job_search_router
 from database import engine
 from models import Base
+from inference_executor import inference_executor
+from cv_parsing import cv_parse_pool
+from model_loader import warm_up, models_status
+from text_embedding_cache import text_embedding_cache
+from parse_cache import parse_cache
 import auth
 
+# Load the NLP models in the background at startup ("0" to load them on first use)
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "1") == "1"
+# Create missing tables at startup ("0" when the schema is managed by create_db.py/migrations)
+CREATE_TABLES_ON_STARTUP = os.getenv("CREATE_TABLES_ON_STARTUP", "1") == "1"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if CREATE_TABLES_ON_STARTUP:
+        # Create database tables
+        Base.metadata.create_all(bind=engine)
+    if WARMUP_MODELS:
+        # Serve logins and listings right away; /health/ready turns green once loaded
+        threading.Thread(target=warm_up, name="model-warmup", daemon=True).start()
+    cv_parse_pool.resume_pending()
+    yield
+    inference_executor.shutdown()
+    cv_parse_pool.shutdown()
+
 # Create FastAPI app
-app = FastAPI(title="Job Recommendation API")
+app = FastAPI(title="Job Recommendation API", lifespan=lifespan)
 
 # Configure CORS
 origins = [
@@ -22,6 +49,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursor of /cv/list-cvs/
+    expose_headers=["X-Next-Skip"],
 )
 
 # Include routers
@@ -31,10 +60,25 @@ app.include_router(jobs_router, tags=["jobs"])
 app.include_router(job_search_router, prefix="/job-search", tags=["job_search"])
 app.include_router(auth.router)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@app.get("/health/ready", tags=["health"])
+def readiness():
+    models = models_status()
+    ready = all(model["loaded"] for model in models.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "models": models},
+    )
+
+@app.get("/metrics/embedding-cache", tags=["health"])
+def embedding_cache_metrics():
+    # Counters are per worker process
+    return text_embedding_cache.stats()
+
+@app.get("/metrics/parse-cache", tags=["health"])
+def parse_cache_metrics():
+    # Lookups happen in the API workers; stores mostly in the parse pool processes
+    return parse_cache.stats()
 
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
-
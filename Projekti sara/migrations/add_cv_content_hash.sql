@@ -0,0 +1,5 @@
+-- SHA-256 of the uploaded file; files are stored content-addressed under uploads/ab/<sha256>.<ext>
+ALTER TABLE cvs
+ADD COLUMN content_hash VARCHAR(64);
+
+CREATE INDEX ix_cvs_content_hash ON cvs (content_hash);
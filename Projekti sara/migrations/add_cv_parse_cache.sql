@@ -0,0 +1,8 @@
+-- Parsed CV data keyed by file SHA-256 and parser version (see cv_upload.parser_version)
+CREATE TABLE cv_parse_cache (
+    content_hash VARCHAR(64) NOT NULL,
+    parser_version VARCHAR(100) NOT NULL,
+    parsed_data JSON NOT NULL,
+    created_at DATETIME,
+    PRIMARY KEY (content_hash, parser_version)
+);
@@ -0,0 +1,4 @@
+-- When a worker claimed the CV for parsing; rows stuck in "parsing" past CV_PARSE_TIMEOUT_SECONDS
+-- (the worker or the whole API died mid-parse) are claimed again on the next start
+ALTER TABLE cvs
+ADD COLUMN parse_started_at DATETIME NULL;
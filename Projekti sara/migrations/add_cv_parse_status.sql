@@ -0,0 +1,6 @@
+-- CVs are parsed in the background; existing rows were parsed on upload
+ALTER TABLE cvs
+ADD COLUMN status VARCHAR(20) NOT NULL DEFAULT 'done',
+ADD COLUMN parse_error TEXT;
+
+CREATE INDEX ix_cvs_user_status_created ON cvs (user_id, status, created_at);
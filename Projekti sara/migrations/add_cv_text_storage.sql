@@ -0,0 +1,17 @@
+-- Sentences move out of cvs.parsed_data into compressed cv_texts rows; skills get their own rows.
+-- Existing CVs keep working as they are; move them afterwards with: python cv_storage.py
+CREATE TABLE cv_texts (
+    cv_id INT NOT NULL PRIMARY KEY,
+    codec VARCHAR(10) NOT NULL,
+    data MEDIUMBLOB NOT NULL,
+    CONSTRAINT fk_cv_texts_cv FOREIGN KEY (cv_id) REFERENCES cvs (id) ON DELETE CASCADE
+);
+
+CREATE TABLE cv_skills (
+    cv_id INT NOT NULL,
+    skill VARCHAR(100) NOT NULL,
+    PRIMARY KEY (cv_id, skill),
+    CONSTRAINT fk_cv_skills_cv FOREIGN KEY (cv_id) REFERENCES cvs (id) ON DELETE CASCADE
+);
+
+CREATE INDEX ix_cv_skills_skill ON cv_skills (skill);
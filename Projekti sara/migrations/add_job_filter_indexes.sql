@@ -0,0 +1,7 @@
+-- Indexes backing the recommendation pre-filters (location, salary band, job type, expiry, recency)
+CREATE INDEX ix_jobs_location_name ON jobs (location_name);
+CREATE INDEX ix_jobs_minimum_salary ON jobs (minimum_salary);
+CREATE INDEX ix_jobs_maximum_salary ON jobs (maximum_salary);
+CREATE INDEX ix_jobs_job_type ON jobs (job_type);
+CREATE INDEX ix_jobs_created_at ON jobs (created_at);
+CREATE INDEX ix_jobs_expiration_date ON jobs (expiration_date);
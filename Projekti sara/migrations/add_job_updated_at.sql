@@ -0,0 +1,6 @@
+-- Last change to a job, set by the database clock so edits made outside the API count too;
+-- workers re-read jobs changed since their last check into their in-memory catalog
+ALTER TABLE jobs
+ADD COLUMN updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP;
+
+CREATE INDEX ix_jobs_updated_at ON jobs (updated_at);
@@ -0,0 +1,22 @@
+-- Recommendations are upserted per (user_id, job_id); fold existing duplicates into the newest row first.
+-- Flags are aggregated over the whole group, so no duplicate's viewed/applied is lost however many there are.
+UPDATE recommendations r
+JOIN (
+  SELECT user_id, job_id, MAX(id) AS id, MAX(viewed) AS viewed, MAX(applied) AS applied
+  FROM recommendations
+  GROUP BY user_id, job_id
+  HAVING COUNT(*) > 1
+) agg ON agg.id = r.id
+SET r.viewed = agg.viewed,
+    r.applied = agg.applied;
+
+DELETE r FROM recommendations r
+JOIN (
+  SELECT user_id, job_id, MAX(id) AS id
+  FROM recommendations
+  GROUP BY user_id, job_id
+  HAVING COUNT(*) > 1
+) agg ON agg.user_id = r.user_id AND agg.job_id = r.job_id AND r.id < agg.id;
+
+ALTER TABLE recommendations
+ADD CONSTRAINT uq_recommendations_user_job UNIQUE (user_id, job_id);
@@ -0,0 +1,66 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Every LazyModel registers itself here so startup warm-up and the readiness
+# endpoint can see all of them
+lazy_models: Dict[str, "LazyModel"] = {}
+
+
+class LazyModel:
+    """Loads a model on first use, exactly once, even under concurrent requests."""
+
+    def __init__(self, name: str, factory: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.factory = factory
+        self.warmup = warmup
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._model = None
+        self._lock = threading.Lock()
+        lazy_models[name] = self
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def get(self) -> Any:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    try:
+                        model = self.factory()
+                        if self.warmup is not None:
+                            self.warmup(model)
+                    except Exception as e:
+                        self.error = str(e)
+                        raise
+                    self.load_seconds = time.perf_counter() - start
+                    self.error = None
+                    self._model = model
+                    logger.info(f"Loaded {self.name} in {self.load_seconds:.2f}s")
+        return self._model
+
+    def status(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+
+def warm_up():
+    """Load every registered model; failures are recorded in status() rather than raised."""
+    for model in list(lazy_models.values()):
+        try:
+            model.get()
+        except Exception as e:
+            logger.error(f"Warm-up of {model.name} failed: {str(e)}")
+
+
+def models_status() -> Dict[str, dict]:
+    return {name: model.status() for name, model in lazy_models.items()}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, DateTime, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, DateTime, JSON, Boolean, UniqueConstraint, Index, LargeBinary, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import datetime
@@ -27,22 +27,25 @@ class Job(Base):
     employer_profile_url = Column(String(255))
     employer_profile_website = Column(String(255))
     employer_profile_logo = Column(String(255))
-    location_name = Column(String(100))
-    minimum_salary = Column(Float)
-    maximum_salary = Column(Float)
+    location_name = Column(String(100), index=True)
+    minimum_salary = Column(Float, index=True)
+    maximum_salary = Column(Float, index=True)
     currency = Column(String(10))
     job_url = Column(String(255))
     applications = Column(Integer)
-    job_type = Column(String(50))
+    job_type = Column(String(50), index=True)
     reed_job_id = Column(Integer, unique=True)  # Store the Reed API job ID
     owner_id = Column(Integer, ForeignKey('users.id'))
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    expiration_date = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    expiration_date = Column(DateTime, index=True)
+    # Database clock, like the ON UPDATE in migrations/add_job_updated_at.sql
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), index=True)
     owner = relationship('User', back_populates='jobs')
     recommendations = relationship('Recommendation', back_populates='job')
 
 class Recommendation(Base):
     __tablename__ = 'recommendations'
+    __table_args__ = (UniqueConstraint('user_id', 'job_id', name='uq_recommendations_user_job'),)
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
     job_id = Column(Integer, ForeignKey('jobs.id'))
@@ -53,13 +56,46 @@ class Recommendation(Base):
     user = relationship('User', back_populates='recommendations')
     job = relationship('Job', back_populates='recommendations')
 
+# CV.status values: CVs are parsed in the background after upload
+CV_PENDING = 'pending'
+CV_PARSING = 'parsing'
+CV_DONE = 'done'
+CV_FAILED = 'failed'
+
 class CV(Base):
     __tablename__ = 'cvs'
+    # Latest parsed CV per user
+    __table_args__ = (Index('ix_cvs_user_status_created', 'user_id', 'status', 'created_at'),)
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
     filename = Column(String(255), nullable=False)
     file_type = Column(String(10), nullable=False)
-    parsed_data = Column(JSON, nullable=False)  # Store as JSON
+    parsed_data = Column(JSON, nullable=False)  # Small parsed fields; sentences are in cv_texts (see cv_storage)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     file_path = Column(String(255), nullable=False)
-    user = relationship('User', back_populates='cvs') 
\ No newline at end of file
+    content_hash = Column(String(64), index=True)  # SHA-256 of the uploaded file
+    status = Column(String(20), nullable=False, default=CV_DONE, server_default=CV_DONE)
+    parse_error = Column(Text, nullable=True)
+    parse_started_at = Column(DateTime, nullable=True)  # When the row was claimed for parsing
+    user = relationship('User', back_populates='cvs') 
+    text = relationship('CVText', uselist=False, cascade='all, delete-orphan')
+    skill_rows = relationship('CVSkill', cascade='all, delete-orphan')
+
+class CVText(Base):
+    __tablename__ = 'cv_texts'
+    # Bulky parsed fields (sentences) as compressed JSON, loaded only when the whole CV is requested
+    cv_id = Column(Integer, ForeignKey('cvs.id', ondelete='CASCADE'), primary_key=True)
+    codec = Column(String(10), nullable=False)
+    data = Column(LargeBinary(length=2 ** 24 - 1), nullable=False)  # MEDIUMBLOB on MySQL
+
+class CVSkill(Base):
+    __tablename__ = 'cv_skills'
+    cv_id = Column(Integer, ForeignKey('cvs.id', ondelete='CASCADE'), primary_key=True)
+    skill = Column(String(100), primary_key=True, index=True)
+
+class CVParseCache(Base):
+    __tablename__ = 'cv_parse_cache'
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 of the file
+    parser_version = Column(String(100), primary_key=True)
+    parsed_data = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
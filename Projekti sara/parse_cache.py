@@ -0,0 +1,89 @@
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import CVParseCache
+
+logger = logging.getLogger(__name__)
+
+
+class ParseCache:
+    """Parsed CV data keyed by (file SHA-256, parser version), stored in cv_parse_cache.
+
+    A re-uploaded or re-imported file skips text extraction and spaCy
+    entirely. Bumping the parser version (see cv_upload.parser_version) makes
+    every older entry unreachable. Counters are per process.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, content_hash: Optional[str], parser_version: str) -> Optional[dict]:
+        entry = db.get(CVParseCache, (content_hash, parser_version)) if content_hash else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry.parsed_data
+
+    def put(self, db: Session, content_hash: Optional[str], parser_version: str, parsed_data: dict):
+        """Store a parse result and commit; losing a race against another writer is fine."""
+        if not content_hash:
+            return
+        try:
+            db.merge(CVParseCache(content_hash=content_hash, parser_version=parser_version, parsed_data=parsed_data))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return
+        with self._lock:
+            self.stores += 1
+
+    def get_many(self, db: Session, content_hashes: Iterable[str], parser_version: str) -> Dict[str, dict]:
+        """Cached parses of several files in one query, keyed by content hash."""
+        content_hashes = list(content_hashes)
+        entries = db.query(CVParseCache.content_hash, CVParseCache.parsed_data).filter(
+            CVParseCache.parser_version == parser_version, CVParseCache.content_hash.in_(content_hashes)
+        ).all() if content_hashes else []
+        found = dict(entries)
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(content_hashes) - len(found)
+        return found
+
+    def put_many(self, db: Session, parser_version: str, parsed: Dict[str, dict]):
+        """Store several parse results in one transaction."""
+        if not parsed:
+            return
+        try:
+            for content_hash, parsed_data in parsed.items():
+                db.merge(CVParseCache(content_hash=content_hash, parser_version=parser_version, parsed_data=parsed_data))
+            db.commit()
+        except IntegrityError:
+            # Another writer stored some of them first; fall back to one at a time
+            db.rollback()
+            for content_hash, parsed_data in parsed.items():
+                self.put(db, content_hash, parser_version, parsed_data)
+            return
+        with self._lock:
+            self.stores += len(parsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+parse_cache = ParseCache()
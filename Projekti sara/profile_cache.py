@@ -0,0 +1,111 @@
+import atexit
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+# Set to a file path to keep profile embeddings across restarts
+PROFILE_CACHE_PATH = os.getenv("PROFILE_CACHE_PATH")
+
+PROFILE_FIELDS = ("skills", "experience", "education")
+
+CacheKey = Tuple[int, str, str]
+
+
+def profile_fingerprint(cv_data: dict) -> str:
+    """Hash of the parsed CV fields that feed the profile text."""
+    payload = json.dumps({field: cv_data.get(field) for field in PROFILE_FIELDS}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ProfileEmbeddingCache:
+    """LRU cache of user profile embeddings keyed by (CV id, profile fingerprint, encoder model version).
+
+    Because the fingerprint covers the CV content, an edit made through another
+    worker can never be served stale; explicit invalidation just frees memory.
+    The model version keeps vectors of a previous encoder out after a switch.
+    """
+
+    def __init__(self, max_size: int = PROFILE_CACHE_SIZE, path: Optional[str] = PROFILE_CACHE_PATH):
+        self.max_size = max_size
+        self.path = path
+        self._entries: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._user_keys: Dict[int, Set[CacheKey]] = {}
+        self._key_users: Dict[CacheKey, int] = {}
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+            atexit.register(self.save)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, cv_id: int, fingerprint: str, model_version: str) -> Optional[np.ndarray]:
+        key = (cv_id, fingerprint, model_version)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+            return vector
+
+    def put(self, user_id: int, cv_id: int, fingerprint: str, model_version: str, vector: np.ndarray):
+        key = (cv_id, fingerprint, model_version)
+        with self._lock:
+            self._entries[key] = np.asarray(vector, dtype=np.float32)
+            self._entries.move_to_end(key)
+            self._user_keys.setdefault(user_id, set()).add(key)
+            self._key_users[key] = user_id
+            while len(self._entries) > self.max_size:
+                self._forget(next(iter(self._entries)))
+
+    def _forget(self, key: CacheKey):
+        self._entries.pop(key, None)
+        user_id = self._key_users.pop(key, None)
+        if user_id is not None:
+            keys = self._user_keys.get(user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._user_keys[user_id]
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for key in list(self._user_keys.get(user_id, ())):
+                self._forget(key)
+
+    def invalidate_cv(self, cv_id: int):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == cv_id]:
+                self._forget(key)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            entries = [(self._key_users.get(key), key, vector) for key, vector in self._entries.items()]
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                entries = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return
+        for user_id, key, vector in entries:
+            # Entries saved before keys carried the model version can't be trusted
+            if len(key) == 3:
+                self.put(user_id, *key, vector)
+
+
+profile_cache = ProfileEmbeddingCache()
@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+RECOMMENDATION_CACHE_TTL_SECONDS = float(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", "300"))
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "10000"))
+
+CacheKey = Tuple[int, Hashable]
+
+
+class RecommendationCache:
+    """Per-user ranked results with a TTL.
+
+    Entries are dropped explicitly when the user's CV changes, and all of them
+    go stale at once when the job catalog changes (catalog_version bump).
+    The cache is per process, so the TTL bounds how long another worker's
+    catalog change can go unnoticed.
+    """
+
+    def __init__(self, ttl: float = RECOMMENDATION_CACHE_TTL_SECONDS, max_size: int = RECOMMENDATION_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.catalog_version = 0
+        self._entries: "OrderedDict[CacheKey, Tuple[float, int, List[dict]]]" = OrderedDict()
+        self._user_keys: Dict[int, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, key: Hashable) -> Optional[List[dict]]:
+        cache_key = (user_id, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return None
+            expires_at, catalog_version, results = entry
+            if expires_at < time.monotonic() or catalog_version != self.catalog_version:
+                self._forget(cache_key)
+                return None
+            self._entries.move_to_end(cache_key)
+            return results
+
+    def put(self, user_id: int, key: Hashable, results: List[dict], catalog_version: Optional[int] = None):
+        """Store results computed against catalog_version (read it before ranking, so a
+        catalog change that lands mid-computation leaves the entry stale)."""
+        cache_key = (user_id, key)
+        if catalog_version is None:
+            catalog_version = self.catalog_version
+        with self._lock:
+            self._entries[cache_key] = (time.monotonic() + self.ttl, catalog_version, results)
+            self._entries.move_to_end(cache_key)
+            self._user_keys.setdefault(user_id, set()).add(cache_key)
+            while len(self._entries) > self.max_size:
+                self._forget(next(iter(self._entries)))
+
+    def _forget(self, cache_key: CacheKey):
+        self._entries.pop(cache_key, None)
+        keys = self._user_keys.get(cache_key[0])
+        if keys is not None:
+            keys.discard(cache_key)
+            if not keys:
+                del self._user_keys[cache_key[0]]
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for cache_key in list(self._user_keys.get(user_id, ())):
+                self._forget(cache_key)
+
+    def invalidate_catalog(self):
+        with self._lock:
+            self.catalog_version += 1
+            self._entries.clear()
+            self._user_keys.clear()
+
+
+recommendation_cache = RecommendationCache()
@@ -1,13 +1,120 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from typing import List, Dict
-from sqlalchemy.orm import Session
-from models import Job, User, CV, Recommendation
+import os
+from typing import List, Dict, Optional, Tuple
+from pydantic import BaseModel
+from sqlalchemy import func, or_, and_
+from sqlalchemy.orm import Session, Query
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from models import Job, User, CV, Recommendation, CV_DONE
+from embedding_store import JobEmbeddingStore, normalize
+from ann_index import build_index
+from profile_cache import profile_cache, profile_fingerprint
+from embedding_service import EMBEDDING_SERVICE_SOCKET, EmbeddingServiceClient
+from encoders import ENCODER_BACKEND, Encoder, backend_version, load_encoder
+from model_loader import LazyModel
+from recommendation_cache import recommendation_cache
+from text_embedding_cache import text_embedding_cache
+from lexical_index import LexicalIndex, profile_query
+from job_catalog import JobCatalog, fetch_descriptions
+from incremental_recommendations import recommendation_heaps
 import datetime
+import threading
+import time
+
+# A filter matching more jobs than this is applied after the vector search instead of before it
+MAX_PREFILTER_CANDIDATES = int(os.getenv("MAX_PREFILTER_CANDIDATES", "50000"))
+# How often the embedding store is fully reconciled with the jobs table
+STORE_SYNC_INTERVAL_SECONDS = float(os.getenv("STORE_SYNC_INTERVAL_SECONDS", "60"))
+# Unfiltered requests are served from the incremental per-user heaps (exact dense top-N). Filters
+# too broad to pre-filter in SQL re-rank the top BM25 candidates with the dense scorer instead of
+# widening a search over the whole index; "0" drops the lexical index and always widens
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1") == "1"
+LEXICAL_CANDIDATES = int(os.getenv("LEXICAL_CANDIDATES", "500"))
+
+def upsert_recommendations(db: Session, rows: List[Dict]):
+    """Insert or refresh recommendation rows in one statement, keyed by (user_id, job_id).
+
+    Existing rows keep their viewed/applied flags; only score and created_at change.
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(Recommendation).values(rows)
+        stmt = stmt.on_duplicate_key_update(score=stmt.inserted.score, created_at=stmt.inserted.created_at)
+    elif dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(Recommendation).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "job_id"],
+            set_={"score": stmt.excluded.score, "created_at": stmt.excluded.created_at}
+        )
+    else:
+        raise NotImplementedError(f"Recommendation upsert is not supported on {dialect}")
+    db.execute(stmt)
+
+class RecommendationFilters(BaseModel):
+    location_name: Optional[str] = None
+    min_salary: Optional[float] = None
+    max_salary: Optional[float] = None
+    job_type: Optional[str] = None
+    exclude_expired: bool = True
+    created_after: Optional[datetime.datetime] = None
+
+    def apply(self, query: Query) -> Query:
+        """Add the filters to a query over Job; every condition can use an index on jobs."""
+        if self.location_name:
+            query = query.filter(Job.location_name.startswith(self.location_name, autoescape=True))
+        if self.min_salary is not None:
+            # The job's band must reach the requested minimum
+            query = query.filter(or_(
+                Job.maximum_salary >= self.min_salary,
+                and_(Job.maximum_salary.is_(None), Job.minimum_salary >= self.min_salary)
+            ))
+        if self.max_salary is not None:
+            query = query.filter(Job.minimum_salary <= self.max_salary)
+        if self.job_type:
+            query = query.filter(Job.job_type == self.job_type)
+        if self.exclude_expired:
+            query = query.filter(or_(Job.expiration_date.is_(None), Job.expiration_date > datetime.datetime.utcnow()))
+        if self.created_after is not None:
+            query = query.filter(Job.created_at >= self.created_after)
+        return query
 
 class JobRecommender:
     def __init__(self):
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self._model = LazyModel("sentence_transformer", self._load_model, warmup=lambda model: model.encode("warm up"))
+        self.store = JobEmbeddingStore()
+        self.index = build_index(self.store)
+        self.lexical = LexicalIndex() if HYBRID_RETRIEVAL else None
+        self.catalog = JobCatalog()
+        self._indexes_version = None
+        self._indexes_lock = threading.Lock()
+        self._last_sync = None
+        # Latest jobs.updated_at already applied to the store, catalog and lexical index,
+        # and the jobs stamped with it that were applied
+        self._jobs_seen_at = None
+        self._jobs_seen_ids = set()
+
+    def _load_model(self) -> Encoder:
+        # With EMBEDDING_SERVICE_SOCKET set, workers share one model in the embedding service,
+        # and embeddings carry the version of the encoder the service runs
+        if EMBEDDING_SERVICE_SOCKET:
+            client = EmbeddingServiceClient(EMBEDDING_SERVICE_SOCKET)
+            info = client.info()
+            return Encoder(info["backend"], client, info["model_version"])
+        return load_encoder(ENCODER_BACKEND)
+
+    @property
+    def model(self) -> Encoder:
+        return self._model.get()
+
+    @property
+    def model_version(self) -> str:
+        """Version of the embeddings the encoder produces, known without loading a local model."""
+        if self._model.loaded or EMBEDDING_SERVICE_SOCKET:
+            return self.model.model_version
+        return backend_version(ENCODER_BACKEND)
 
     def get_embeddings(self, text: str) -> np.ndarray:
         return self.model.encode(text)
@@ -15,14 +122,11 @@ class JobRecommender:
     def calculate_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         return float(np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2)))
 
-    def get_user_profile(self, user: User, db: Session) -> str:
-        latest_cv = db.query(CV).filter(CV.user_id == user.id).order_by(CV.created_at.desc()).first()
-        if not latest_cv or not latest_cv.parsed_data:
-            return ""
-
-        # FIXED: parsed_data is already a dict, no need for json.loads
-        cv_data = latest_cv.parsed_data  
+    def get_latest_cv(self, user: User, db: Session):
+        # CVs still being parsed (or failed) are invisible to recommendations
+        return db.query(CV).filter(CV.user_id == user.id, CV.status == CV_DONE).order_by(CV.created_at.desc()).first()
 
+    def build_profile_text(self, cv_data: dict) -> str:
         profile_parts = []
 
         if 'skills' in cv_data:
@@ -34,47 +138,285 @@ class JobRecommender:
 
         return " ".join(profile_parts)
 
-    def get_job_embedding(self, job: Job) -> np.ndarray:
-        job_text = f"{job.title} {job.description}"
-        return self.get_embeddings(job_text)
+    def get_user_profile(self, user: User, db: Session) -> str:
+        latest_cv = self.get_latest_cv(user, db)
+        if not latest_cv or not latest_cv.parsed_data:
+            return ""
+
+        # FIXED: parsed_data is already a dict, no need for json.loads
+        return self.build_profile_text(latest_cv.parsed_data)
 
-    def get_recommendations(self, user: User, db: Session, top_k: int = 5) -> List[Dict]:
-        user_profile = self.get_user_profile(user, db)
+    def get_user_embedding(self, user: User, db: Session, latest_cv: Optional[CV] = None) -> Optional[np.ndarray]:
+        """Profile embedding of the user's latest CV, encoded at most once per CV content."""
+        if latest_cv is None:
+            latest_cv = self.get_latest_cv(user, db)
+        if not latest_cv or not latest_cv.parsed_data:
+            return None
+
+        fingerprint = profile_fingerprint(latest_cv.parsed_data)
+        cached = profile_cache.get(latest_cv.id, fingerprint, self.model_version)
+        if cached is not None:
+            return cached
+
+        user_profile = self.build_profile_text(latest_cv.parsed_data)
         if not user_profile:
+            return None
+        embedding = self.get_embeddings(user_profile)
+        profile_cache.put(user.id, latest_cv.id, fingerprint, self.model.model_version, embedding)
+        return embedding
+
+    def get_job_text(self, job: Job) -> str:
+        return f"{job.title} {job.description}"
+
+    def get_job_embedding(self, job: Job) -> np.ndarray:
+        if job.id in self.store:
+            return self.store.get([job.id])[0]
+        return text_embedding_cache.encode(self.model, [self.get_job_text(job)])[0]
+
+    def index_jobs(self, jobs: List[Job], force: bool = False):
+        """Encode jobs once and persist their vectors in the embedding store.
+
+        With force, jobs already stored are refreshed: catalog fields always, the
+        vector and lexical terms only if their text changed.
+        """
+        # Writes go on top of the latest committed store, so pick up other workers' changes first
+        self.refresh_store()
+        if not force:
+            jobs = [job for job in jobs if job.id not in self.store]
+        if not jobs:
+            return
+        embeddings = normalize(text_embedding_cache.encode(self.model, [self.get_job_text(job) for job in jobs]))
+        changed = [i for i, job in enumerate(jobs)
+                   if job.id not in self.store or float(self.store.get([job.id])[0] @ embeddings[i]) < 1 - 1e-6]
+        job_ids = [jobs[i].id for i in changed]
+        if job_ids:
+            self.store.add(job_ids, embeddings[changed], self.model.model_version)
+            self.index.add(job_ids)
+            if self.lexical is not None:
+                self.lexical.add((jobs[i].id, jobs[i].title, jobs[i].description) for i in changed)
+            # Updated jobs are rescored: drop the old score, then merge like a new job
+            recommendation_heaps.remove_jobs(job_ids)
+            recommendation_heaps.add_jobs(job_ids, self.store.get(job_ids))
+        # Cached rankings only go stale if a vector or a served catalog field changed
+        if self.catalog.upsert(jobs) or job_ids:
+            recommendation_cache.invalidate_catalog()
+
+    def remove_jobs(self, job_ids: List[int]):
+        self.refresh_store()
+        stored = self.store.remove(job_ids)
+        if stored:
+            self.index.remove(job_ids)
+        listed = self.catalog.remove(job_ids)
+        if self.lexical is not None:
+            self.lexical.remove(job_ids)
+        recommendation_heaps.remove_jobs(job_ids)
+        if stored or listed:
+            recommendation_cache.invalidate_catalog()
+
+    def refresh_store(self):
+        """Reload the store if another worker changed the catalog.
+
+        Jobs that worker removed leave the per-user heaps; jobs it added or
+        re-encoded are (re)scored into them.
+        """
+        before = self.store.snapshot
+        if self.store.refresh():
+            after = self.store.snapshot
+            removed = np.setdiff1d(before.sorted_ids, after.sorted_ids)
+            rescored = np.union1d(np.setdiff1d(after.sorted_ids, before.sorted_ids),
+                                  self.store.overwritten_between(before, after))
+            if len(removed) or len(rescored):
+                recommendation_heaps.remove_jobs(np.union1d(removed, rescored).tolist())
+                recommendation_heaps.add_jobs(rescored.tolist(), self.store.get(rescored))
+                recommendation_cache.invalidate_catalog()
+
+    def sync_store(self, db: Session, force: bool = False):
+        """Reconcile the store with the jobs table when jobs changed outside the API."""
+        if self._jobs_seen_at is None:
+            # Taken before the first catalog load, so edits made while it runs are re-read later
+            self._jobs_seen_at = db.query(func.max(Job.updated_at)).scalar() or datetime.datetime.min
+        self.refresh_store()
+        if len(self.store) and self.store.model_version != self.model_version:
+            # Vectors from another encoder (or of unknown origin) can't be compared with ours:
+            # empty the store and let the reconcile below re-encode every job
+            self.store.reset(self.model_version)
+            recommendation_heaps.clear()
+            recommendation_cache.invalidate_catalog()
+            force = True
+        self.sync_indexes(db)
+        now = time.monotonic()
+        if not force and self._last_sync is not None and now - self._last_sync < STORE_SYNC_INTERVAL_SECONDS:
+            return
+        self._last_sync = now
+        self.refresh_updated_jobs(db)
+        if db.query(func.count(Job.id)).scalar() == len(self.store):
+            return
+        job_ids = np.array([job_id for (job_id,) in db.query(Job.id).all()], dtype=np.int64)
+        stale = np.setdiff1d(self.store.ids, job_ids)
+        if len(stale):
+            self.remove_jobs(stale.tolist())
+        missing = np.setdiff1d(job_ids, self.store.ids).tolist()
+        for start in range(0, len(missing), 1000):
+            self.index_jobs(db.query(Job).filter(Job.id.in_(missing[start:start + 1000])).all())
+
+    def refresh_updated_jobs(self, db: Session):
+        """Re-read jobs changed since the last check (title, salary, location, expiry, ...).
+
+        jobs.updated_at has no finer resolution than a second, so the second of
+        the last check is queried again; of its rows only those not applied yet
+        are refreshed, and an idle tick does nothing.
+        """
+        seen_at, seen_ids = self._jobs_seen_at, self._jobs_seen_ids
+        changed = [(job_id, updated_at) for job_id, updated_at in
+                   db.query(Job.id, Job.updated_at).filter(Job.updated_at >= seen_at)
+                   if updated_at != seen_at or job_id not in seen_ids]
+        if not changed:
+            return
+        job_ids = [job_id for job_id, _ in changed]
+        for start in range(0, len(job_ids), 1000):
+            self.index_jobs(db.query(Job).filter(Job.id.in_(job_ids[start:start + 1000])).all(), force=True)
+        latest = max(updated_at for _, updated_at in changed)
+        latest_ids = {job_id for job_id, updated_at in changed if updated_at == latest}
+        self._jobs_seen_ids = seen_ids | latest_ids if latest == seen_at else latest_ids
+        self._jobs_seen_at = latest
+
+    def sync_indexes(self, db: Session):
+        """Bring the job catalog and the lexical index to the jobs held by the embedding store
+        (e.g. after a restart or a change saved by another worker)."""
+        if self._indexes_version == self.store.version:
+            return
+        # One sync at a time, and the version is only recorded once it succeeded, so a
+        # concurrent request or a failed query never leaves the indexes marked as current
+        with self._indexes_lock:
+            version, store_ids = self.store.version, self.store.ids
+            if self._indexes_version == version:
+                return
+            self.catalog.sync(db, store_ids)
+            if self.lexical is not None:
+                lexical_ids = self.lexical.ids()
+                self.lexical.remove(np.setdiff1d(lexical_ids, store_ids).tolist())
+                missing = np.setdiff1d(store_ids, lexical_ids).tolist()
+                for start in range(0, len(missing), 1000):
+                    chunk = missing[start:start + 1000]
+                    self.lexical.add(db.query(Job.id, Job.title, Job.description).filter(Job.id.in_(chunk)))
+            self._indexes_version = version
+
+    def score_batch(self, user_vectors: np.ndarray, top_k: int = 5) -> List[List[Tuple[int, float]]]:
+        """Score one or many user vectors against the job index.
+
+        Returns, per user, the top_k (job_id, cosine similarity) pairs best first.
+        """
+        return self.index.search(user_vectors, top_k)
+
+    def get_candidate_ids(self, filters: RecommendationFilters, db: Session) -> Optional[List[int]]:
+        """Job ids passing the filters, or None when the filters are not selective enough to pre-filter."""
+        job_ids = [job_id for (job_id,) in filters.apply(db.query(Job.id)).limit(MAX_PREFILTER_CANDIDATES + 1)]
+        if len(job_ids) > MAX_PREFILTER_CANDIDATES:
+            return None
+        return job_ids
+
+    def post_filter(self, ranked: List[Tuple[int, float]], filters: RecommendationFilters, db: Session) -> List[Tuple[int, float]]:
+        """Keep the ranked jobs that pass the filters, in rank order."""
+        passing = {job_id for (job_id,) in filters.apply(db.query(Job.id).filter(Job.id.in_([job_id for job_id, _ in ranked])))}
+        return [(job_id, score) for job_id, score in ranked if job_id in passing]
+
+    def rank_filtered(self, cv_data: dict, user_embedding: np.ndarray, filters: RecommendationFilters,
+                      db: Session, top_k: int) -> List[Tuple[int, float]]:
+        candidate_ids = self.get_candidate_ids(filters, db)
+        if candidate_ids is not None:
+            return self.index.search_subset(user_embedding, candidate_ids, top_k)[0]
+
+        # Broad filter: re-rank the lexical candidates that pass it
+        if self.lexical is not None:
+            ranked = self.rank_hybrid(cv_data, user_embedding, filters, db, top_k)
+            if ranked is not None:
+                return ranked
+        # Too few of them: search the whole index and keep the hits that pass, widening until we have enough
+        fetch = top_k * 4
+        while True:
+            ranked = self.score_batch(user_embedding, fetch)[0]
+            kept = self.post_filter(ranked, filters, db)
+            if len(kept) >= top_k or len(ranked) < fetch:
+                return kept[:top_k]
+            fetch *= 4
+
+    def rank_hybrid(self, cv_data: dict, user_embedding: np.ndarray, filters: RecommendationFilters,
+                    db: Session, top_k: int) -> Optional[List[Tuple[int, float]]]:
+        """Dense re-rank of the union of the top BM25 hits for the CV's skills and for its full profile.
+
+        Returns None when the lexical stage finds fewer than top_k usable candidates.
+        """
+        skills_query = profile_query({'skills': cv_data.get('skills')})
+        candidates = {job_id for job_id, _ in self.lexical.search(skills_query, LEXICAL_CANDIDATES)}
+        candidates.update(job_id for job_id, _ in self.lexical.search(profile_query(cv_data), LEXICAL_CANDIDATES))
+        if len(candidates) < top_k:
+            return None
+        candidates = {job_id for (job_id,) in filters.apply(db.query(Job.id).filter(Job.id.in_(list(candidates))))}
+        if len(candidates) < top_k:
+            return None
+        return self.index.search_subset(user_embedding, list(candidates), top_k)[0]
+
+    def rank_incremental(self, user: User, profile_key: Tuple[int, str], user_embedding: np.ndarray,
+                         filters: RecommendationFilters, db: Session, top_k: int) -> Optional[List[Tuple[int, float]]]:
+        """Serve from the user's incrementally maintained heap, seeding it on first use.
+
+        Returns None if too few heap entries pass the filters (e.g. many expired).
+        """
+        tracked = recommendation_heaps.get(user.id, profile_key, top_k)
+        if tracked is None:
+            tracked = self.score_batch(user_embedding, recommendation_heaps.heap_size)[0]
+            recommendation_heaps.seed(user.id, profile_key, user_embedding, tracked)
+        kept = self.post_filter(tracked, filters, db)
+        return kept[:top_k] if len(kept) >= top_k else None
+
+    def get_recommendations(self, user: User, db: Session, top_k: int = 5, filters: Optional[RecommendationFilters] = None) -> List[Dict]:
+        latest_cv = self.get_latest_cv(user, db)
+        if not latest_cv or not latest_cv.parsed_data:
+            return []
+
+        filters = filters or RecommendationFilters()
+        self.sync_store(db)
+        profile_key = (latest_cv.id, profile_fingerprint(latest_cv.parsed_data), self.model_version)
+        cache_key = profile_key + (top_k, filters.model_dump_json())
+        cached = recommendation_cache.get(user.id, cache_key)
+        if cached is not None:
+            return cached
+        catalog_version = recommendation_cache.catalog_version
+
+        user_embedding = self.get_user_embedding(user, db, latest_cv)
+        if user_embedding is None:
             return []
+        ranked = None
+        if filters == RecommendationFilters():
+            ranked = self.rank_incremental(user, profile_key, user_embedding, filters, db, top_k)
+        if ranked is None:
+            ranked = self.rank_filtered(latest_cv.parsed_data, user_embedding, filters, db, top_k)
 
-        user_embedding = self.get_embeddings(user_profile)
-        jobs = db.query(Job).all()
-        job_scores = []
-
-        for job in jobs:
-            job_embedding = self.get_job_embedding(job)
-            similarity = self.calculate_similarity(user_embedding, job_embedding)
-            job_scores.append({
-                'job': job,
-                'score': similarity
-            })
-
-        job_scores.sort(key=lambda x: x['score'], reverse=True)
-        top_recommendations = job_scores[:top_k]
-
-        for rec in top_recommendations:
-            recommendation = Recommendation(
-                user_id=user.id,
-                job_id=rec['job'].id,
-                score=rec['score'],
-                created_at=datetime.datetime.utcnow()
-            )
-            db.add(recommendation)
+        # Only the returned jobs are looked up, and only they pay for a description
+        jobs = self.catalog.get(job_id for job_id, _ in ranked)
+        descriptions = fetch_descriptions(db, list(jobs))
+        top_recommendations = [{
+            'job': jobs[job_id],
+            'score': score
+        } for job_id, score in ranked if job_id in descriptions]
 
+        now = datetime.datetime.utcnow()
+        upsert_recommendations(db, [{
+            'user_id': user.id,
+            'job_id': rec['job'].id,
+            'score': rec['score'],
+            'created_at': now
+        } for rec in top_recommendations])
         db.commit()
 
-        return [{
+        results = [{
             'job_id': rec['job'].id,
             'title': rec['job'].title,
-            'description': rec['job'].description,
+            'description': descriptions[rec['job'].id],
             'similarity_score': rec['score']
         } for rec in top_recommendations]
+        recommendation_cache.put(user.id, cache_key, results, catalog_version)
+        return results
 
 # Create an instance outside so you can reuse it
 recommender = JobRecommender()
@@ -0,0 +1,69 @@
+"""Skill extraction against a taxonomy of canonical skills and their aliases.
+
+The taxonomy is a JSON object mapping each canonical skill to a list of
+aliases ({"node.js": ["node", "nodejs"], ...}). All names are compiled once
+into a spaCy PhraseMatcher on lowercased token text, which walks the
+document once however large the taxonomy is, and matches multi-word skills
+such as "machine learning" or "google cloud".
+"""
+import hashlib
+import json
+import os
+from typing import Dict, List
+
+SKILLS_TAXONOMY_PATH = os.getenv(
+    "SKILLS_TAXONOMY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "skills_taxonomy.json"))
+
+# Taxonomy file path -> content hash
+_versions: Dict[str, str] = {}
+
+
+def load_taxonomy(path: str = SKILLS_TAXONOMY_PATH) -> Dict[str, List[str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def taxonomy_version(path: str = SKILLS_TAXONOMY_PATH) -> str:
+    """Short content hash of the taxonomy file, so parser_version changes with it.
+
+    Hashed once per process, like the matcher is built once: a file edited while
+    the app runs takes effect for both on restart.
+    """
+    if path not in _versions:
+        with open(path, "rb") as f:
+            _versions[path] = hashlib.sha256(f.read()).hexdigest()[:12]
+    return _versions[path]
+
+
+class SkillMatcher:
+    """Finds canonical skills in tokenized spaCy docs."""
+
+    def __init__(self, nlp, taxonomy: Dict[str, List[str]]):
+        from spacy.matcher import PhraseMatcher
+
+        self.matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+        # Labels are resolved here rather than through doc.vocab, so docs from another
+        # pipeline with the same tokenizer can be matched too
+        self.labels: Dict[int, str] = {}
+        self.size = 0
+        for skill, aliases in taxonomy.items():
+            names = list(dict.fromkeys([skill, *aliases]))
+            # The tokenizer is enough to build patterns; the rest of the pipeline isn't run
+            self.matcher.add(skill, list(nlp.tokenizer.pipe(names)))
+            self.labels[nlp.vocab.strings[skill]] = skill
+            self.size += len(names)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __call__(self, doc) -> List[str]:
+        """Canonical skills in order of first mention."""
+        # Overlapping matches keep the longest, so "google cloud platform" isn't also "google cloud"
+        matches = sorted(self.matcher(doc), key=lambda match: (match[1] - match[2], match[1]))
+        taken = set()
+        found = []
+        for match_id, start, end in matches:
+            if taken.isdisjoint(range(start, end)):
+                taken.update(range(start, end))
+                found.append((start, self.labels[match_id]))
+        return list(dict.fromkeys(skill for _, skill in sorted(found)))
@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from embedding_store import EMBEDDINGS_DIR
+
+TEXT_EMBEDDING_CACHE_SIZE = int(os.getenv("TEXT_EMBEDDING_CACHE_SIZE", "50000"))
+# SQLite file shared by every process on the host; empty keeps the cache in memory only
+TEXT_EMBEDDING_CACHE_PATH = os.getenv("TEXT_EMBEDDING_CACHE_PATH", os.path.join(EMBEDDINGS_DIR, "text_embeddings.sqlite3"))
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, bytes]
+
+
+def text_hash(text: str) -> bytes:
+    """SHA-256 of the text with Unicode and whitespace differences normalized away."""
+    normalized = " ".join(unicodedata.normalize("NFKC", text).split())
+    return hashlib.sha256(normalized.encode("utf-8")).digest()
+
+
+class TextEmbeddingCache:
+    """Embeddings keyed by (model version, normalized text hash).
+
+    Reposted jobs with the same title and description are encoded once: an
+    in-process LRU sits in front of a SQLite table shared by every worker and
+    by both the ingestion path and the recommender. Texts that miss both
+    tiers are encoded together in a single batch.
+    """
+
+    def __init__(self, max_size: int = TEXT_EMBEDDING_CACHE_SIZE, path: Optional[str] = TEXT_EMBEDDING_CACHE_PATH):
+        self.max_size = max_size
+        self.path = path or None
+        self._entries: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.requests = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.encoded = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS text_embeddings ("
+                "model_version TEXT NOT NULL, text_hash BLOB NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model_version, text_hash)) WITHOUT ROWID"
+            )
+            self._local.connection = connection
+        return connection
+
+    def _remember(self, key: CacheKey, vector: np.ndarray):
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _read_disk(self, model_version: str, hashes: List[bytes]) -> Dict[bytes, np.ndarray]:
+        found = {}
+        if not self.path or not hashes:
+            return found
+        try:
+            connection = self._connection()
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = connection.execute(
+                    f"SELECT text_hash, vector FROM text_embeddings WHERE model_version = ? "
+                    f"AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [model_version, *chunk]
+                )
+                for digest, blob in rows:
+                    found[bytes(digest)] = np.frombuffer(blob, dtype=np.float32).copy()
+        except sqlite3.Error as e:
+            logger.error(f"Text embedding cache read failed: {str(e)}")
+        return found
+
+    def _write_disk(self, model_version: str, vectors: Dict[bytes, np.ndarray]):
+        if not self.path or not vectors:
+            return
+        try:
+            connection = self._connection()
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO text_embeddings (model_version, text_hash, vector) VALUES (?, ?, ?)",
+                    [(model_version, digest, vector.tobytes()) for digest, vector in vectors.items()]
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Text embedding cache write failed: {str(e)}")
+
+    def encode(self, encoder, texts: List[str]) -> np.ndarray:
+        """Embeddings for texts, one row each, encoding only what neither tier holds."""
+        model_version = encoder.model_version
+        hashes = [text_hash(text) for text in texts]
+        vectors: Dict[bytes, np.ndarray] = {}
+        memory_hits = 0
+        with self._lock:
+            for digest in hashes:
+                vector = self._entries.get((model_version, digest))
+                if vector is not None:
+                    self._entries.move_to_end((model_version, digest))
+                    vectors[digest] = vector
+                    memory_hits += 1
+
+        missing = list(dict.fromkeys(digest for digest in hashes if digest not in vectors))
+        from_disk = self._read_disk(model_version, missing)
+        for digest, vector in from_disk.items():
+            self._remember((model_version, digest), vector)
+        vectors.update(from_disk)
+        disk_hits = sum(1 for digest in hashes if digest in from_disk)
+
+        # Identical texts within the batch are encoded once
+        pending = {digest: text for digest, text in zip(hashes, texts) if digest not in vectors}
+        if pending:
+            encoded = np.asarray(encoder.encode(list(pending.values())), dtype=np.float32)
+            fresh = dict(zip(pending, encoded))
+            for digest, vector in fresh.items():
+                self._remember((model_version, digest), vector)
+            self._write_disk(model_version, fresh)
+            vectors.update(fresh)
+
+        with self._lock:
+            self.requests += len(texts)
+            self.memory_hits += memory_hits
+            self.disk_hits += disk_hits
+            self.misses += len(texts) - memory_hits - disk_hits
+            self.encoded += len(pending)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([vectors[digest] for digest in hashes])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "encoded": self.encoded,
+                "hit_rate": (self.memory_hits + self.disk_hits) / self.requests if self.requests else 0.0,
+                "memory_entries": len(self._entries),
+            }
+
+
+text_embedding_cache = TextEmbeddingCache()
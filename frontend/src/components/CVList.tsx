@@ -10,9 +10,8 @@ interface CV {
   id: number;
   filename: string;
   file_type: string;
-  parsed_data: {
-    entities: Record<string, string>;
-    skills: string[];
+  parsed_data?: {
+    skills?: string[];
   };
   created_at: string;
 }
@@ -20,20 +19,28 @@ interface CV {
 const CVList: React.FC = () => {
   const [cvs, setCVs] = useState<CV[]>([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // skip of the next page, null when the last page is loaded
+  const [nextSkip, setNextSkip] = useState<number | null>(null);
   const [deleteId, setDeleteId] = useState<number | null>(null);
   const [deleting, setDeleting] = useState(false);
 
-  const fetchCVs = async () => {
+  const fetchCVs = async (skip = 0) => {
+    setLoadingMore(skip > 0);
     try {
       const response = await axios.get('http://localhost:8000/cv/list-cvs/', {
+        params: { fields: 'skills', skip },
         withCredentials: true,
       });
-      setCVs(response.data);
+      setCVs((prev) => (skip > 0 ? [...prev, ...response.data] : response.data));
+      const next = response.headers['x-next-skip'];
+      setNextSkip(next ? Number(next) : null);
     } catch (error) {
       console.error('Error fetching CVs:', error);
       toast.error('Failed to load CVs');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
@@ -47,6 +54,8 @@ const CVList: React.FC = () => {
       await axios.delete(`http://localhost:8000/cv/delete-cv/${id}/`, { withCredentials: true });
       toast.success('CV deleted successfully!');
       setCVs((prev) => prev.filter((cv) => cv.id !== id));
+      // Later CVs moved up by one
+      setNextSkip((prev) => (prev === null ? null : prev - 1));
     } catch (error) {
       toast.error('Failed to delete CV');
     } finally {
@@ -101,7 +110,7 @@ const CVList: React.FC = () => {
               </Box>
             </Box>
 
-            {cv.parsed_data.skills && cv.parsed_data.skills.length > 0 && (
+            {cv.parsed_data?.skills && cv.parsed_data.skills.length > 0 && (
               <Box mt={2}>
                 <Typography variant="subtitle2" fontWeight={600} mb={1}>
                   Skills
@@ -127,6 +136,13 @@ const CVList: React.FC = () => {
           </CardContent>
         </Card>
       ))}
+      {nextSkip !== null && (
+        <Box display="flex" justifyContent="center">
+          <Button variant="outlined" onClick={() => fetchCVs(nextSkip)} disabled={loadingMore}>
+            {loadingMore ? <CircularProgress size={20} color="inherit" /> : 'Load more'}
+          </Button>
+        </Box>
+      )}
       <Dialog open={!!deleteId} onClose={() => setDeleteId(null)}>
         <DialogTitle>Remove CV</DialogTitle>
         <DialogContent>
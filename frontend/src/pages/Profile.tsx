@@ -50,6 +50,8 @@ interface EditData {
 function Profile() {
   const { user } = useAuth();
   const [cvs, setCvs] = useState<CV[]>([]);
+  // skip of the next page of CVs, null when the last page is loaded
+  const [nextSkip, setNextSkip] = useState<number | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [uploadSuccess, setUploadSuccess] = useState(false);
@@ -73,19 +75,34 @@ function Profile() {
     { text: 'Applied to Frontend Developer job', date: '2024-05-25' },
   ];
 
+  const fetchCVs = async (skip = 0) => {
+    const response = await axios.get('http://localhost:8000/cv/list-cvs/', { params: { skip } });
+    setCvs((prev) => (skip > 0 ? [...prev, ...response.data] : response.data));
+    const next = response.headers['x-next-skip'];
+    setNextSkip(next ? Number(next) : null);
+  };
+
+  const loadMoreCVs = async () => {
+    if (nextSkip === null) return;
+    try {
+      await fetchCVs(nextSkip);
+    } catch (err) {
+      setError('Failed to fetch CVs');
+    }
+  };
+
   useEffect(() => {
-    const fetchCVs = async () => {
+    const fetchFirstPage = async () => {
       if (!user) return;
       try {
-        const response = await axios.get('http://localhost:8000/cv/list-cvs/');
-        setCvs(response.data);
+        await fetchCVs();
       } catch (err) {
         setError('Failed to fetch CVs');
       } finally {
         setLoading(false);
       }
     };
-    fetchCVs();
+    fetchFirstPage();
   }, [user]);
 
   useEffect(() => {
@@ -109,8 +126,7 @@ function Profile() {
       });
       setUploadSuccess(true);
       // Refresh CV list
-      const response = await axios.get('http://localhost:8000/cv/list-cvs/');
-      setCvs(response.data);
+      await fetchCVs();
     } catch (err) {
       setError('Failed to upload CV');
     }
@@ -355,6 +371,11 @@ function Profile() {
                         </Box>
                       </Card>
                     ))}
+                    {nextSkip !== null && (
+                      <Button variant="text" onClick={loadMoreCVs} sx={{ alignSelf: 'center', fontWeight: 700 }}>
+                        Load more
+                      </Button>
+                    )}
                   </Stack>
                 ) : (
                   <Typography color="text.secondary">